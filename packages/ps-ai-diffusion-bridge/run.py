@@ -1,8 +1,10 @@
 """Standalone FastAPI server entry point.
 
 Run with: python run.py
+Set BRIDGE_RELOAD=1 to restart automatically when source files change.
 """
 import logging
+import os
 import uvicorn
 
 # Configure logging to show debug info
@@ -16,5 +18,11 @@ if __name__ == "__main__":
         "src.fastapi_app:app",
         host="0.0.0.0",
         port=7860,
-        reload=True,
+        reload=os.getenv("BRIDGE_RELOAD", "") not in ("", "0"),
+        # "auto" picks uvloop and httptools when installed (uvicorn[standard]
+        # on Linux/macOS) and falls back to asyncio/h11 on Windows.
+        loop="auto",
+        http="auto",
+        # The plugin polls job status several times per second
+        access_log=False,
     )
@@ -4,12 +4,14 @@ Provides the same interface as shared/network.py's RequestManager but uses aioht
 """
 
 import asyncio
-import json
+import copy
+import functools
 import ssl
-from typing import AsyncIterator
+from typing import AsyncIterator, Callable
 
 import aiohttp
 import certifi
+import orjson
 
 
 class NetworkError(Exception):
@@ -34,34 +36,123 @@ class NetworkError(Exception):
         return self.message
 
 
+# Session-wide defaults. Per-request timeouts only override the total.
+CONNECT_TIMEOUT = 15
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=CONNECT_TIMEOUT, sock_read=60)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+BINARY_HEADERS = {"Content-Type": "application/octet-stream"}
+
+
+# One session (and connection pool) per event loop, shared by all request
+# managers. Sessions are bound to the loop they were created on.
+_shared_session: aiohttp.ClientSession | None = None
+_shared_loop: asyncio.AbstractEventLoop | None = None
+
+
+@functools.cache
+def _ssl_context() -> ssl.SSLContext:
+    """SSL context using certifi's CA bundle, built once (loading it parses the whole bundle)."""
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def _get_shared_session() -> aiohttp.ClientSession:
+    """Return the process-wide session, creating it on first use."""
+    global _shared_session, _shared_loop
+    loop = asyncio.get_running_loop()
+    if _shared_session is None or _shared_session.closed or _shared_loop is not loop:
+        # Polling, uploads and downloads all go to a handful of hosts:
+        # keep connections alive and cache DNS lookups between requests.
+        # aiohttp only speaks HTTP/1.1, so concurrent requests each hold a
+        # pooled connection; the per-host limit bounds how many handshakes
+        # a burst of uploads can cause.
+        connector = aiohttp.TCPConnector(
+            ssl=_ssl_context(),
+            limit=64,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+        )
+        _shared_session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+        _shared_loop = loop
+    return _shared_session
+
+
+async def shutdown_shared_session():
+    """Close the shared session. Call once on application shutdown."""
+    global _shared_session, _shared_loop
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+    _shared_loop = None
+
+
+# Upload bodies are streamed from memory in chunks, any bytes-like object works
+Buffer = bytes | bytearray | memoryview
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+
+
+async def _chunks(
+    data: Buffer,
+    on_sent: Callable[[int], None] | None = None,
+    size: int = UPLOAD_CHUNK_SIZE,
+) -> AsyncIterator[memoryview]:
+    """Yield data in zero-copy chunks, reporting the number of bytes sent."""
+    view = memoryview(data)
+    for offset in range(0, len(view), size):
+        yield view[offset:offset + size]
+        if on_sent:
+            on_sent(min(offset + size, len(view)))
+
+
+def _upload_headers(sha256: str | None) -> dict[str, str]:
+    if not sha256:
+        return BINARY_HEADERS
+    return {**BINARY_HEADERS, "x-amz-checksum-sha256": sha256}
+
+
 class AiohttpRequestManager:
     """
     Aiohttp implementation of RequestManager.
     Provides async HTTP methods compatible with shared/cloud_client.py.
     """
 
-    def __init__(self):
+    def __init__(self, user_agent: str | None = None):
         self._session: aiohttp.ClientSession | None = None
         self._bearer_token: str | None = None
+        self._user_agent = user_agent
+        # Prebuilt header dicts keyed on (token, is_json). Treat as read-only.
+        self._headers: dict[tuple[str | None, bool], dict[str, str]] = {}
+        # GET requests currently in flight, keyed on (url, token)
+        self._inflight: dict[tuple[str, str | None], asyncio.Future] = {}
 
     async def ensure_session(self):
-        """Lazy session creation with proper SSL context."""
-        if self._session is None or self._session.closed:
-            # Create SSL context using certifi's CA bundle
-            ssl_context = ssl.create_default_context(cafile=certifi.where())
-            connector = aiohttp.TCPConnector(ssl=ssl_context)
-            self._session = aiohttp.ClientSession(connector=connector)
+        """Attach to the shared session (created lazily)."""
+        self._session = _get_shared_session()
 
     def set_auth(self, bearer: str):
         """Set default bearer token for all requests."""
         self._bearer_token = bearer
 
-    def _get_headers(self, bearer: str | None = None) -> dict:
-        """Build request headers with optional bearer token."""
-        headers = {}
+    def _get_headers(self, bearer: str | None = None, json: bool = False) -> dict:
+        """Return request headers with optional bearer token.
+
+        The returned dict is cached and shared between requests, don't modify it.
+        """
         token = bearer or self._bearer_token
-        if token:
-            headers["Authorization"] = f"Bearer {token}"
+        key = (token, json)
+        headers = self._headers.get(key)
+        if headers is None:
+            headers = {"User-Agent": self._user_agent} if self._user_agent else {}
+            if token:
+                headers[aiohttp.hdrs.AUTHORIZATION] = f"Bearer {token}"
+            if json:
+                headers.update(JSON_HEADERS)
+            if len(self._headers) >= 8:
+                self._headers.clear()
+            self._headers[key] = headers
         return headers
 
     async def get(
@@ -73,6 +164,9 @@ class AiohttpRequestManager:
         """
         GET request, auto-parses JSON responses.
 
+        Concurrent GETs for the same URL and token share one request, callers
+        which joined it get their own copy of the parsed JSON.
+
         Args:
             url: Request URL
             timeout: Optional timeout in seconds
@@ -81,15 +175,30 @@ class AiohttpRequestManager:
         Returns:
             Parsed JSON dict or raw bytes
         """
+        key = (url, bearer or self._bearer_token)
+        request = self._inflight.get(key)
+        if request is None:
+            request = asyncio.ensure_future(self._get(url, timeout, bearer))
+            self._inflight[key] = request
+            request.add_done_callback(lambda r: self._inflight_done(key, r))
+            # Shield so one cancelled caller doesn't cancel the request for the others
+            return await asyncio.shield(request)
+        result = await asyncio.shield(request)
+        return copy.deepcopy(result) if isinstance(result, dict) else result
+
+    def _inflight_done(self, key: tuple, request: asyncio.Future):
+        if self._inflight.get(key) is request:
+            del self._inflight[key]
+
+    async def _get(self, url: str, timeout: float | None, bearer: str | None) -> dict | bytes:
         await self.ensure_session()
         assert self._session is not None
 
         headers = self._get_headers(bearer)
-        client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
 
         try:
             async with self._session.get(
-                url, headers=headers, timeout=client_timeout
+                url, headers=headers, timeout=self._timeout(timeout)
             ) as response:
                 return await self._handle_response(response, url)
         except aiohttp.ClientError as e:
@@ -99,10 +208,47 @@ class AiohttpRequestManager:
                 0, "Connection timed out, the server took too long to respond", url
             )
 
+    async def get_if_changed(
+        self,
+        url: str,
+        etag: str | None = None,
+        bearer: str | None = None,
+    ) -> tuple[dict | bytes | None, str | None]:
+        """
+        Conditional GET, revalidating a previous response by its ETag.
+
+        Args:
+            url: Request URL
+            etag: ETag of the cached response, if any
+            bearer: Optional bearer token (overrides default)
+
+        Returns:
+            Tuple of (data, etag). data is None if the resource is unchanged.
+        """
+        await self.ensure_session()
+        assert self._session is not None
+
+        headers = self._get_headers(bearer)
+        if etag:
+            headers = {**headers, aiohttp.hdrs.IF_NONE_MATCH: etag}
+
+        try:
+            async with self._session.get(url, headers=headers) as response:
+                if response.status == 304:
+                    return None, etag
+                data = await self._handle_response(response, url)
+                return data, response.headers.get(aiohttp.hdrs.ETAG)
+        except aiohttp.ClientError as e:
+            raise NetworkError(0, str(e), url)
+        except asyncio.TimeoutError:
+            raise NetworkError(
+                0, "Connection timed out, the server took too long to respond", url
+            )
+
     async def post(
         self,
         url: str,
-        data: dict,
+        data: dict | bytes,
         bearer: str | None = None,
     ) -> dict | bytes:
         """
@@ -110,7 +256,7 @@ class AiohttpRequestManager:
 
         Args:
             url: Request URL
-            data: JSON data to send
+            data: JSON data to send, or an already encoded JSON body
             bearer: Optional bearer token (overrides default)
 
         Returns:
@@ -119,18 +265,20 @@ class AiohttpRequestManager:
         await self.ensure_session()
         assert self._session is not None
 
-        headers = self._get_headers(bearer)
-        headers["Content-Type"] = "application/json"
+        headers = self._get_headers(bearer, json=True)
+        body = data if isinstance(data, bytes) else orjson.dumps(data)
 
         try:
-            async with self._session.post(
-                url, json=data, headers=headers
-            ) as response:
+            async with self._session.post(url, data=body, headers=headers) as response:
                 return await self._handle_response(response, url)
         except aiohttp.ClientError as e:
             raise NetworkError(0, str(e), url)
+        except asyncio.TimeoutError:
+            raise NetworkError(
+                0, "Connection timed out, the server took too long to respond", url
+            )
 
-    async def put(self, url: str, data: bytes) -> None:
+    async def put(self, url: str, data: Buffer) -> None:
         """
         PUT binary data (for S3 upload).
 
@@ -139,27 +287,24 @@ class AiohttpRequestManager:
             data: Binary data to upload
         """
         await self.ensure_session()
-        assert self._session is not None
+        await self._put(url, data, BINARY_HEADERS)
 
-        headers = {"Content-Type": "application/octet-stream"}
+    async def upload(self, url: str, data: Buffer, sha256: str | None = None) -> None:
+        """
+        Upload file, see upload_with_progress to track progress.
 
-        try:
-            async with self._session.put(url, data=data, headers=headers) as response:
-                if response.status >= 400:
-                    text = await response.text()
-                    raise NetworkError(
-                        response.status,
-                        f"Upload failed: {text}",
-                        url,
-                        status=response.status,
-                    )
-        except aiohttp.ClientError as e:
-            raise NetworkError(0, str(e), url)
+        Args:
+            url: Request URL
+            data: Binary data to upload
+            sha256: Optional SHA256 checksum for S3
+        """
+        await self.ensure_session()
+        await self._put(url, data, _upload_headers(sha256))
 
-    async def upload(
+    async def upload_with_progress(
         self,
         url: str,
-        data: bytes,
+        data: Buffer,
         sha256: str | None = None,
     ) -> AsyncIterator[tuple[int, int]]:
         """
@@ -174,21 +319,42 @@ class AiohttpRequestManager:
             Tuple of (bytes_sent, total_bytes)
         """
         await self.ensure_session()
-        assert self._session is not None
-
-        headers = {"Content-Type": "application/octet-stream"}
-        if sha256:
-            headers["x-amz-checksum-sha256"] = sha256
 
+        headers = _upload_headers(sha256)
         total = len(data)
-        chunk_size = 64 * 1024  # 64KB chunks for progress reporting
-
+        sent_queue: asyncio.Queue[int] = asyncio.Queue()
+        request = asyncio.create_task(self._put(url, data, headers, sent_queue.put_nowait))
         try:
-            # For simple implementation, we upload all at once
-            # and report progress at start and end
             yield (0, total)
-
-            async with self._session.put(url, data=data, headers=headers) as response:
+            sent = 0
+            while sent < total:
+                next_sent = asyncio.ensure_future(sent_queue.get())
+                await asyncio.wait((next_sent, request), return_when=asyncio.FIRST_COMPLETED)
+                if not next_sent.done():
+                    next_sent.cancel()
+                    break
+                sent = next_sent.result()
+                yield (sent, total)
+            await request
+        finally:
+            if not request.done():
+                request.cancel()
+
+    async def _put(
+        self,
+        url: str,
+        data: Buffer,
+        headers: dict,
+        on_sent: Callable[[int], None] | None = None,
+    ):
+        """Stream data to url in chunks instead of handing aiohttp one big buffer."""
+        assert self._session is not None
+        # Explicit length: S3 presigned URLs reject chunked transfer encoding
+        headers = {**headers, aiohttp.hdrs.CONTENT_LENGTH: str(len(data))}
+        try:
+            async with self._session.put(
+                url, data=_chunks(data, on_sent), headers=headers
+            ) as response:
                 if response.status >= 400:
                     text = await response.text()
                     raise NetworkError(
@@ -197,8 +363,6 @@ class AiohttpRequestManager:
                         url,
                         status=response.status,
                     )
-
-            yield (total, total)
         except aiohttp.ClientError as e:
             raise NetworkError(0, str(e), url)
 
@@ -216,18 +380,9 @@ class AiohttpRequestManager:
         await self.ensure_session()
         assert self._session is not None
 
-        client_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
-
         try:
-            async with self._session.get(url, timeout=client_timeout) as response:
-                if response.status >= 400:
-                    text = await response.text()
-                    raise NetworkError(
-                        response.status,
-                        f"Download failed: {text}",
-                        url,
-                        status=response.status,
-                    )
+            async with self._session.get(url, timeout=self._timeout(timeout)) as response:
+                await self._check_download(response, url)
                 return await response.read()
         except aiohttp.ClientError as e:
             raise NetworkError(0, str(e), url)
@@ -236,13 +391,64 @@ class AiohttpRequestManager:
                 0, "Connection timed out, the server took too long to respond", url
             )
 
+    async def download_stream(
+        self, url: str, timeout: float | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Download file in chunks, without buffering the whole body.
+
+        Args:
+            url: Request URL
+            timeout: Optional timeout in seconds
+
+        Yields:
+            Chunks of the response body
+        """
+        await self.ensure_session()
+        assert self._session is not None
+
+        try:
+            async with self._session.get(url, timeout=self._timeout(timeout)) as response:
+                await self._check_download(response, url)
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    yield chunk
+        except aiohttp.ClientError as e:
+            raise NetworkError(0, str(e), url)
+        except asyncio.TimeoutError:
+            raise NetworkError(
+                0, "Connection timed out, the server took too long to respond", url
+            )
+
+    async def _check_download(self, response: aiohttp.ClientResponse, url: str):
+        if response.status >= 400:
+            text = await response.text()
+            raise NetworkError(
+                response.status,
+                f"Download failed: {text}",
+                url,
+                status=response.status,
+            )
+
+    def _timeout(self, total: float | None) -> aiohttp.ClientTimeout:
+        """Session default timeout, optionally with a total time limit."""
+        if not total:
+            return DEFAULT_TIMEOUT
+        return aiohttp.ClientTimeout(total=total, sock_connect=CONNECT_TIMEOUT)
+
     async def _handle_response(
         self, response: aiohttp.ClientResponse, url: str
     ) -> dict | bytes:
         """Handle response, parsing JSON if appropriate."""
+        is_json = response.content_type == "application/json"
         if response.status >= 400:
-            try:
-                data = await response.json()
+            body = await response.read()
+            data = None
+            if is_json:
+                try:
+                    data = orjson.loads(body)
+                except orjson.JSONDecodeError:
+                    pass
+            if isinstance(data, dict):
                 error = data.get("error", "Network error")
                 raise NetworkError(
                     response.status,
@@ -251,23 +457,33 @@ class AiohttpRequestManager:
                     status=response.status,
                     data=data,
                 )
-            except (json.JSONDecodeError, aiohttp.ContentTypeError):
-                text = await response.text()
-                raise NetworkError(
-                    response.status,
-                    f"{text} ({response.reason})",
-                    url,
-                    status=response.status,
-                )
+            text = body.decode("utf-8", errors="replace")
+            raise NetworkError(
+                response.status,
+                f"{text} ({response.reason})",
+                url,
+                status=response.status,
+            )
 
-        content_type = response.headers.get("Content-Type", "")
-        if "application/json" in content_type:
-            return await response.json()
-        else:
-            return await response.read()
+        if is_json:
+            return orjson.loads(await response.read())
+        return await response.read()
 
     async def close(self):
-        """Close the session."""
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        """Release this manager's reference to the shared session.
+
+        The session itself stays open for other users, see
+        shutdown_shared_session. Safe to call more than once.
+        """
+        inflight = list(self._inflight.values())
+        self._inflight.clear()
+        for request in inflight:
+            request.cancel()
+        self._session = None
+
+    async def __aenter__(self) -> "AiohttpRequestManager":
+        await self.ensure_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
@@ -0,0 +1,121 @@
+"""Coalescing of compatible generation requests into batched jobs.
+
+Requests that only differ by their (random) seed produce identical workflows,
+so several of them arriving close together can be submitted as a single
+backend job with a larger batch size. Each caller gets back the id of the
+shared job plus the offset of its images inside that batch.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH = 8
+MAX_WAIT = 0.05  # seconds, used while the backend is busy anyway
+MIN_WAIT = 0.005  # seconds, used while the backend is idle
+
+
+@dataclass(slots=True)
+class _PendingGroup:
+    payload: Any
+    members: list[tuple[int, asyncio.Future]] = field(default_factory=list)
+    total: int = 0
+    full: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class RequestCoalescer:
+    """Groups requests with equal keys that arrive within a short window.
+
+    Args:
+        submit: Coroutine called once per group with the payload of the first
+            request and the summed count. Returns the backend job id.
+        is_busy: Returns True while the backend still has outstanding work.
+            New requests would queue behind it regardless, so the collection
+            window is longer in that case.
+    """
+
+    def __init__(
+        self,
+        submit: Callable[[Any, int], Awaitable[str]],
+        is_busy: Callable[[], bool] = lambda: False,
+        max_batch: int = MAX_BATCH,
+        max_wait: float = MAX_WAIT,
+        min_wait: float = MIN_WAIT,
+    ):
+        self._submit = submit
+        self._is_busy = is_busy
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.min_wait = min_wait
+        self._pending: dict[Hashable, _PendingGroup] = {}
+        # Keeps running groups alive, the loop only holds weak references
+        self._tasks: set[asyncio.Task] = set()
+
+    async def enqueue(self, key: Hashable, payload: Any, count: int) -> tuple[str, int]:
+        """Queue a request and wait until its group was submitted.
+
+        Returns:
+            Tuple of (job_id, offset) where offset is the index of the first
+            image belonging to this request within the job.
+        """
+        if count >= self.max_batch:
+            return await self._submit(payload, count), 0
+
+        group = self._pending.get(key)
+        if group is not None and group.total + count > self.max_batch:
+            self._close(key, group)
+            group = None
+        if group is None:
+            group = _PendingGroup(payload=payload)
+            self._pending[key] = group
+            wait = self.max_wait if self._is_busy() else self.min_wait
+            task = asyncio.create_task(self._run(key, group, wait))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        future = asyncio.get_running_loop().create_future()
+        offset = group.total
+        group.members.append((offset, future))
+        group.total += count
+        if group.total >= self.max_batch:
+            self._close(key, group)
+
+        job_id = await future
+        return job_id, offset
+
+    def _close(self, key: Hashable, group: _PendingGroup) -> None:
+        if self._pending.get(key) is group:
+            del self._pending[key]
+        group.full.set()
+
+    async def _run(self, key: Hashable, group: _PendingGroup, wait: float) -> None:
+        try:
+            try:
+                await asyncio.wait_for(group.full.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            self._close(key, group)
+
+            pending = [f for _, f in group.members if not f.done()]
+            if not pending:
+                return
+            if len(group.members) > 1:
+                logger.debug("Coalesced %d requests into one batch of %d", len(group.members), group.total)
+            try:
+                job_id = await self._submit(group.payload, group.total)
+            except Exception as e:
+                for future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for future in pending:
+                if not future.done():
+                    future.set_result(job_id)
+        finally:
+            # Cancelled while waiting or submitting, members must not wait forever
+            self._close(key, group)
+            for _, future in group.members:
+                if not future.done():
+                    future.cancel()
@@ -4,14 +4,20 @@ This is a reimplementation of shared/cloud_client.py without Qt dependencies.
 """
 
 import asyncio
+import base64
+import hashlib
+import logging
 import os
 import platform
+import time
 import uuid
-from dataclasses import asdict
+from collections import OrderedDict
 from enum import Enum
 from typing import AsyncIterator
 
 from .aiohttp_request_manager import AiohttpRequestManager, NetworkError
+from . import disk_cache
+from .batching import RequestCoalescer
 from .cloud_types import (
     CloudFeatures,
     CloudJobState,
@@ -19,23 +25,66 @@ from .cloud_types import (
     CloudNews,
     CloudPaymentRequired,
     CloudUser,
+    ImageBytes,
     ImageData,
 )
+from .ids import new_job_id
 
 # Import shared modules that don't depend on Qt
 import src.path_setup  # noqa: F401
 
 from shared.api import WorkflowInput
 
+logger = logging.getLogger(__name__)
+
 # Plugin version for API calls
 PLUGIN_VERSION = "1.0.0"
 
-# Polling interval for job status
+# Polling interval for job status. Jobs waiting in the queue are polled with
+# an increasing delay up to MAX_QUEUE_POLL_INTERVAL.
 POLL_INTERVAL = 0.5  # seconds
+MAX_QUEUE_POLL_INTERVAL = 5.0  # seconds
+
+# Maximum number of LoRA uploads running at the same time per job
+MAX_CONCURRENT_UPLOADS = 4
+
+# Maximum number of jobs uploading inputs and submitting at the same time
+MAX_CONCURRENT_SUBMITS = 8
+
+# Uploaded input images are reused for identical content. Uploads go to
+# temporary storage, so only reuse them for a limited time.
+UPLOAD_CACHE_TTL = 10 * 60  # seconds
+MAX_CACHED_UPLOADS = 32
 
 # Auth timeout
 AUTH_TIMEOUT = 300  # seconds
 
+# Sign-in confirmation polling, increasing up to the maximum
+SIGN_IN_POLL_INTERVAL = 1.0  # seconds
+MAX_SIGN_IN_POLL_INTERVAL = 10.0  # seconds
+
+# How long fetched plugin resources (model lists) are reused
+RESOURCES_TTL = 300  # seconds
+
+# Number of jobs kept in memory. Once exceeded, the oldest finished jobs
+# (and their images) are dropped.
+MAX_JOBS = 256
+# Finished jobs are also dropped this long after they were submitted
+JOB_RETENTION = 30 * 60  # seconds
+
+# Pre-encoded body of status polls
+_EMPTY_JSON = b"{}"
+
+# Server job statuses which mean the job is still waiting or running
+_PENDING_STATUSES = frozenset(("in_queue", "in_progress"))
+
+_TERMINAL_STATUSES = (
+    CloudJobStatus.finished,
+    CloudJobStatus.error,
+    CloudJobStatus.cancelled,
+    CloudJobStatus.timed_out,
+)
+
 
 class JobState(Enum):
     """Internal job state for three-stage processing."""
@@ -56,18 +105,33 @@ class CloudClientManager:
     default_api_url = os.getenv("INTERSTICE_URL", "https://api.interstice.cloud")
     default_web_url = os.getenv("INTERSTICE_WEB_URL", "https://www.interstice.cloud")
 
-    def __init__(self):
-        self._requests = AiohttpRequestManager()
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self._poll_interval = poll_interval
+        self._requests = AiohttpRequestManager(user_agent=f"ps-ai-diffusion/{PLUGIN_VERSION}")
         self._token: str | None = None
         self._user: CloudUser | None = None
         self._news: CloudNews | None = None
         self._features = CloudFeatures()
         self._is_connected = False
-        self._jobs: dict[str, CloudJobState] = {}
+        self._jobs: OrderedDict[str, CloudJobState] = OrderedDict()
+        # Jobs merged into a batch: job_id -> (batch job_id, offset, count)
+        self._batch_members: dict[str, tuple[str, int, int]] = {}
+        self._coalescer = RequestCoalescer(self._submit_batch, is_busy=self._has_active_jobs)
+        self._submit_slots = asyncio.Semaphore(MAX_CONCURRENT_SUBMITS)
+        # Recent image uploads: content digest -> (start time, S3 object)
+        self._uploads: OrderedDict[bytes, tuple[float, asyncio.Future[str]]] = OrderedDict()
         self._models: dict = {}
+        self._models_fetched_at = 0.0
+        # Token the models were fetched with, other accounts may see other models
+        self._models_token: str | None = None
 
         # For sign-in flow state
         self._sign_in_client_id: str | None = None
+        self._sign_in_cancel = asyncio.Event()
+        # Confirmation polls back off while the user is busy in the browser
+        self._sign_in_delay = SIGN_IN_POLL_INTERVAL
+        self._sign_in_next_poll = 0.0
+        self._sign_in_deadline = 0.0
 
     @property
     def is_connected(self) -> bool:
@@ -97,9 +161,11 @@ class CloudClientManager:
 
     async def _post(self, op: str, data: dict) -> dict:
         """POST request to cloud API."""
-        return await self._requests.post(
-            f"{self.default_api_url}/{op}", data, bearer=self._token
-        )
+        return await self._post_url(f"{self.default_api_url}/{op}", data)
+
+    async def _post_url(self, url: str, data: dict | bytes) -> dict:
+        """POST request to an absolute (pre-built) cloud API URL."""
+        return await self._requests.post(url, data, bearer=self._token)
 
     # === Authentication ===
 
@@ -111,6 +177,10 @@ class CloudClientManager:
             URL for user to open in browser to complete sign-in
         """
         self._sign_in_client_id = str(uuid.uuid4())
+        self._sign_in_cancel.clear()
+        self._sign_in_delay = SIGN_IN_POLL_INTERVAL
+        self._sign_in_next_poll = 0.0
+        self._sign_in_deadline = asyncio.get_running_loop().time() + AUTH_TIMEOUT
         info = f"PS AI Diffusion [Device: {platform.node()}]"
 
         init = await self._post(
@@ -125,12 +195,25 @@ class CloudClientManager:
         """
         Check if sign-in is complete.
 
+        Polls after a pending answer are spaced out further each time, calls
+        in between report pending without asking the service.
+
         Returns:
             Tuple of (token, user) if authorized, None if still pending
+
+        Raises:
+            TimeoutError: If the sign-in was started more than AUTH_TIMEOUT ago
         """
         if not self._sign_in_client_id:
             raise ValueError("sign_in_start() must be called first")
 
+        loop = asyncio.get_running_loop()
+        if loop.time() > self._sign_in_deadline:
+            self._sign_in_client_id = None
+            raise TimeoutError("Sign-in attempt timed out after 5 minutes")
+        if loop.time() < self._sign_in_next_poll:
+            return None
+
         auth_confirm = await self._post(
             "auth/confirm", {"client_id": self._sign_in_client_id}
         )
@@ -143,15 +226,26 @@ class CloudClientManager:
             user = await self.authenticate(token)
             return (token, user)
         elif status == "not-found":
+            self._sign_in_next_poll = loop.time() + self._sign_in_delay
+            self._sign_in_delay = min(self._sign_in_delay * 1.5, MAX_SIGN_IN_POLL_INTERVAL)
             return None
         else:
             self._sign_in_client_id = None
             raise RuntimeError(f"Authorization failed: {status}")
 
+    def cancel_sign_in(self):
+        """Abort a pending sign-in.
+
+        Later sign_in_confirm() calls fail, the sign_in() loop stops immediately.
+        """
+        self._sign_in_client_id = None
+        self._sign_in_cancel.set()
+
     async def sign_in(self) -> AsyncIterator[str | tuple[str, CloudUser]]:
         """
         Complete sign-in flow as async generator.
         First yields sign_in_url, then yields (token, user) when complete.
+        Ends without a result if cancel_sign_in() is called.
 
         Yields:
             First: sign_in_url (str)
@@ -160,18 +254,20 @@ class CloudClientManager:
         sign_in_url = await self.sign_in_start()
         yield sign_in_url
 
-        start_time = asyncio.get_event_loop().time()
+        loop = asyncio.get_running_loop()
         while True:
             result = await self.sign_in_confirm()
             if result is not None:
                 yield result
                 return
 
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > AUTH_TIMEOUT:
-                raise TimeoutError("Sign-in attempt timed out after 5 minutes")
-
-            await asyncio.sleep(2)
+            # Sleep until sign_in_confirm() asks the service again
+            delay = max(self._sign_in_next_poll - loop.time(), 0.0)
+            try:
+                await asyncio.wait_for(self._sign_in_cancel.wait(), timeout=delay)
+                return
+            except asyncio.TimeoutError:
+                pass
 
     async def authenticate(self, token: str) -> CloudUser:
         """
@@ -205,15 +301,25 @@ class CloudClientManager:
 
         self._features = self._enumerate_features(user_data)
 
-        if news_text := user_data.get("news"):
-            import hashlib
-
-            digest = hashlib.sha256(news_text.encode("utf-8")).hexdigest()[:16]
+        news_text = user_data.get("news")
+        if news_text and (self._news is None or self._news.text != news_text):
+            # Only re-hash when the news changed since the last sign-in
+            # First 8 bytes, same as the first 16 hex digits
+            digest = hashlib.sha256(
+                news_text.encode("utf-8"), usedforsecurity=False
+            ).digest()[:8].hex()
             self._news = CloudNews(news_text, digest)
 
-        # Fetch available models
-        model_data = await self._get("plugin/resources")
-        self._models = model_data
+        # Fetch available models (rarely change, skip on quick reconnects)
+        now = time.monotonic()
+        if (
+            not self._models
+            or self._models_token != token
+            or now - self._models_fetched_at > RESOURCES_TTL
+        ):
+            self._models = await self._fetch_resources()
+            self._models_fetched_at = now
+            self._models_token = token
 
         self._is_connected = True
         return self._user
@@ -227,11 +333,30 @@ class CloudClientManager:
             max_control_layers=user_data.get("max_control_layers", 4),
         )
 
+    async def _fetch_resources(self) -> dict:
+        """Fetch plugin/resources, revalidating the copy cached on disk by its ETag."""
+        path = disk_cache.cache_path("resources", self.default_api_url, self._token)
+        cached = await asyncio.to_thread(disk_cache.read_json, path)
+        if not (isinstance(cached, dict) and "etag" in cached and "data" in cached):
+            cached = None
+
+        data, etag = await self._requests.get_if_changed(
+            f"{self.default_api_url}/plugin/resources",
+            etag=cached["etag"] if cached else None,
+            bearer=self._token,
+        )
+        if data is None and cached:
+            return cached["data"]
+        if etag:
+            await asyncio.to_thread(disk_cache.write_json, path, {"etag": etag, "data": data})
+        return data
+
     async def disconnect(self):
         """Disconnect from cloud service."""
         self._is_connected = False
         self._token = None
         self._user = None
+        # The HTTP session is shared process-wide, it is closed on shutdown
         await self._requests.close()
 
     # === Job Management ===
@@ -256,14 +381,74 @@ class CloudClientManager:
         # Apply cloud service limits (same as krita-ai-diffusion)
         _apply_limits(work, self._features)
 
-        job_id = str(uuid.uuid4())
+        job_id = new_job_id()
         self._jobs[job_id] = CloudJobState(status=CloudJobStatus.queued)
+        self._prune_jobs()
 
         # Start job processing in background
         asyncio.create_task(self._process_job(job_id, work, lora_payloads or {}))
 
         return job_id
 
+    def _prune_jobs(self):
+        """Drop jobs which finished more than JOB_RETENTION ago, and the oldest
+        finished jobs once more than MAX_JOBS are stored."""
+        expired = time.monotonic() - JOB_RETENTION
+        excess = len(self._jobs) - MAX_JOBS
+        stale = []
+        # Jobs are ordered by creation time
+        for job_id, job in self._jobs.items():
+            if job_id in self._batch_members:
+                self.get_job(job_id)  # members mirror their batch lazily
+            if job.status not in _TERMINAL_STATUSES:
+                continue
+            if len(stale) < excess or (job.finished_at is not None and job.finished_at < expired):
+                stale.append(job_id)
+        for job_id in stale:
+            # Members of a batch take over their images before it is dropped
+            members = [m for m, link in self._batch_members.items() if link[0] == job_id]
+            for member_id in members:
+                self.get_job(member_id)
+                del self._batch_members[member_id]
+            del self._jobs[job_id]
+            self._batch_members.pop(job_id, None)
+
+    async def enqueue_batched(
+        self,
+        key,
+        work: WorkflowInput,
+        lora_payloads: dict[str, tuple[str, bytes]] | None = None,
+        batch_size: int = 1,
+    ) -> str:
+        """Submit a generation job, merging it with identical concurrent requests.
+
+        Only use this for requests with a random seed; requests sharing ``key``
+        must produce the same workflow apart from the seed. Returns a job id
+        which only exposes the images belonging to this request.
+        """
+        batch_id, offset = await self._coalescer.enqueue(key, (work, lora_payloads), batch_size)
+        batch = self._jobs[batch_id]
+        if offset == 0 and work.batch_count == batch_size:
+            return batch_id
+
+        job_id = new_job_id()
+        self._jobs[job_id] = CloudJobState(status=batch.status)
+        self._batch_members[job_id] = (batch_id, offset, batch_size)
+        return job_id
+
+    async def _submit_batch(self, payload, batch_size: int) -> str:
+        work, lora_payloads = payload
+        work.batch_count = batch_size
+        return await self.enqueue(work, lora_payloads=lora_payloads)
+
+    def _has_active_jobs(self) -> bool:
+        # Members are only synced when polled, their batch tells whether they are done
+        return any(
+            job.status not in _TERMINAL_STATUSES
+            for job_id, job in self._jobs.items()
+            if job_id not in self._batch_members
+        )
+
     async def _process_job(
         self,
         job_id: str,
@@ -271,47 +456,65 @@ class CloudClientManager:
         lora_payloads: dict[str, tuple[str, bytes]],
     ):
         """Process a job through send -> generate -> receive stages."""
-        import logging
-        logger = logging.getLogger(__name__)
-
         job = self._jobs[job_id]
 
         try:
-            # Stage 1: Send (prepare and upload inputs)
-            job.status = CloudJobStatus.uploading
-            input_data = work.to_dict(max_image_size=16 * 1024)
-            logger.info(f"[Cloud] Workflow input_data keys: {input_data.keys()}")
-            logger.info(f"[Cloud] Workflow kind: {input_data.get('kind')}")
-            logger.info(f"[Cloud] Workflow models: {input_data.get('models')}")
-            logger.info(f"[Cloud] Workflow sampling: {input_data.get('sampling')}")
-            await self._send_loras(work, lora_payloads)
-            await self._send_images(input_data)
-
-            if job.cancel_requested:
-                job.status = CloudJobStatus.cancelled
-                return
+            # Uploads and submission are bandwidth heavy, limit how many jobs do
+            # them at once. Polling below is cheap and runs for all jobs.
+            async with self._submit_slots:
+                if job.cancel_requested:
+                    # Cancelled while waiting for a slot
+                    job.status = CloudJobStatus.cancelled
+                    return
+
+                # Stage 1: Send (prepare and upload inputs)
+                job.status = CloudJobStatus.uploading
+                # Serializing input images is CPU work, keep it off the event loop
+                input_data = await asyncio.to_thread(work.to_dict, max_image_size=16 * 1024)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "[Cloud] Workflow kind=%s models=%s sampling=%s",
+                        input_data.get("kind"),
+                        input_data.get("models"),
+                        input_data.get("sampling"),
+                    )
+                # LoRA and image uploads are independent, run them concurrently
+                await asyncio.gather(
+                    self._send_loras(work, lora_payloads),
+                    self._send_images(input_data),
+                )
+
+                if job.cancel_requested:
+                    job.status = CloudJobStatus.cancelled
+                    return
 
-            # Stage 2: Generate (submit and poll)
-            job.status = CloudJobStatus.in_queue
-            data = {
-                "input": {
-                    "workflow": input_data,
-                    "clientInfo": f"ps-ai-diffusion {PLUGIN_VERSION}",
-                    "options": {"useWebpCompression": False},
+                # Stage 2: Generate (submit and poll)
+                job.status = CloudJobStatus.in_queue
+                data = {
+                    "input": {
+                        "workflow": input_data,
+                        "clientInfo": f"ps-ai-diffusion {PLUGIN_VERSION}",
+                        "options": {"useWebpCompression": False},
+                    }
                 }
-            }
-
-            logger.info(f"[Cloud] Submitting generate request...")
-            response = await self._post("generate", data)
-            logger.info(f"[Cloud] Generate response keys: {response.keys()}")
-            logger.info(f"[Cloud] Generate response id: {response.get('id')}")
-            logger.info(f"[Cloud] Generate response worker_id: {response.get('worker_id')}")
-            logger.info(f"[Cloud] Generate response status: {response.get('status')}")
-            logger.info(f"[Cloud] Generate response full: {response}")
-            remote_id = response["id"]
-            worker_id = response.get("worker_id")
-            job.remote_id = remote_id
-            job.worker_id = worker_id
+
+                logger.debug("[Cloud] Submitting generate request for job %s", job_id)
+                response = await self._post("generate", data)
+                logger.info(
+                    "[Cloud] Job %s submitted: id=%s worker_id=%s status=%s",
+                    job_id,
+                    response.get("id"),
+                    response.get("worker_id"),
+                    response.get("status"),
+                )
+                remote_id = response["id"]
+                worker_id = response.get("worker_id")
+                job.remote_id = remote_id
+                job.worker_id = worker_id
+
+                # The job is on the server now. Release the inputs, which can
+                # hold large images and LoRA files, for the rest of polling.
+                del work, lora_payloads, input_data, data
 
             # Update user credits
             if self._user and "user" in response:
@@ -323,18 +526,20 @@ class CloudClientManager:
                 )
 
             # Poll for completion
+            status_url = f"{self.default_api_url}/status/{remote_id}"
             status = response.get("status", "").lower()
-            logger.info(f"[Cloud] Initial status: {status}")
-            while status in ("in_queue", "in_progress"):
+            delay = self._poll_interval
+            while status in _PENDING_STATUSES:
                 if job.cancel_requested:
-                    # Cancellation request is handled via cancel() which also performs remote cancel.
-                    # We stop polling and let the job end in cancelled state.
+                    # cancel() may have run before the job was submitted, in
+                    # which case the remote job still needs to be stopped.
+                    await self._cancel_remote(job)
                     job.status = CloudJobStatus.cancelled
                     return
 
-                response = await self._post(f"status/{remote_id}", {})
+                response = await self._post_url(status_url, _EMPTY_JSON)
                 status = response.get("status", "").lower()
-                logger.info(f"[Cloud] Poll status: {status}, response: {response}")
+                logger.debug("[Cloud] Poll status: %s", status)
 
                 if status == "in_queue":
                     job.status = CloudJobStatus.in_queue
@@ -343,7 +548,12 @@ class CloudClientManager:
                     if output := response.get("output"):
                         job.progress = output.get("progress", 0.09)
 
-                await asyncio.sleep(POLL_INTERVAL)
+                delay = _poll_delay(status, job.progress, delay, self._poll_interval)
+                # Sleep until the next poll, or until cancel() is called
+                try:
+                    await asyncio.wait_for(job.cancel_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
 
             # Handle final status
             if status == "completed":
@@ -367,7 +577,7 @@ class CloudClientManager:
                 job.error = "Generation took too long and was cancelled (timeout)"
 
         except NetworkError as e:
-            logger.error(f"[Cloud] NetworkError: status={e.status}, message={e.message}")
+            logger.error("[Cloud] NetworkError: status=%s, message=%s", e.status, e.message)
             job.status = CloudJobStatus.error
             if e.status == 402:
                 # 402 Payment Required: provide structured payload for UI CTAs.
@@ -390,32 +600,61 @@ class CloudClientManager:
                 job.error = e.message
 
         except Exception as e:
-            logger.exception(f"[Cloud] Unexpected error: {e}")
+            logger.exception("[Cloud] Unexpected error: %s", e)
             job.status = CloudJobStatus.error
             job.error = str(e)
 
+        finally:
+            if job.finished_at is None:
+                job.finished_at = time.monotonic()
+
     async def _send_images(self, inputs: dict, max_inline_size: int = 4096):
-        """Upload images if needed."""
+        """Upload images if needed.
+
+        The workflow serializer packs all input images (canvas, control
+        layers, references) into a single blob with offsets, so there is
+        at most one upload per job. It runs concurrently with LoRA uploads.
+        """
         if image_data := inputs.get("image_data"):
             blob = image_data.get("bytes", b"")
             offsets = image_data.get("offsets", [])
 
-            if isinstance(blob, bytes):
-                import base64
-                import math
-
-                base64_size = math.ceil(len(blob) / 3) * 4
-                if base64_size < max_inline_size:
+            if isinstance(blob, (bytes, bytearray, memoryview)):
+                # Compare raw size against the base64 budget (4 chars per 3 bytes)
+                if len(blob) < max_inline_size * 3 // 4:
                     # Small image: inline as base64
-                    encoded = base64.b64encode(blob).decode("utf-8")
+                    encoded = base64.b64encode(blob).decode("ascii")
                     inputs["image_data"] = {"base64": encoded, "offsets": offsets}
                 else:
                     # Large image: upload to S3
                     s3_object = await self._upload_image(blob)
                     inputs["image_data"] = {"s3_object": s3_object, "offsets": offsets}
 
-    async def _upload_image(self, data: bytes) -> str:
-        """Upload image to temporary S3 storage."""
+    async def _upload_image(self, data: bytes | bytearray | memoryview) -> str:
+        """Upload image to temporary S3 storage.
+
+        Identical images (e.g. when re-running a workflow with a new prompt)
+        reuse a recent upload, or wait for one that is still in progress.
+        """
+        digest = await asyncio.to_thread(_content_digest, data)
+        now = time.monotonic()
+        cached = self._uploads.get(digest)
+        if cached is not None and now - cached[0] < UPLOAD_CACHE_TTL:
+            self._uploads.move_to_end(digest)
+            return await asyncio.shield(cached[1])
+
+        upload = asyncio.ensure_future(self._put_image(data))
+        self._uploads[digest] = (now, upload)
+        if len(self._uploads) > MAX_CACHED_UPLOADS:
+            self._uploads.popitem(last=False)
+        try:
+            return await asyncio.shield(upload)
+        except Exception:
+            if self._uploads.get(digest, (0, None))[1] is upload:
+                del self._uploads[digest]
+            raise
+
+    async def _put_image(self, data: bytes | bytearray | memoryview) -> str:
         upload_info = await self._post("upload/image", {})
         await self._requests.put(upload_info["url"], data)
         return upload_info["object"]
@@ -434,13 +673,22 @@ class CloudClientManager:
         if not models or not models.loras:
             return
 
+        uploads = []
         for lora in models.loras:
             if lora.name not in lora_payloads:
                 continue
             storage_id, data = lora_payloads[lora.name]
             # Ensure WorkflowInput references the uploaded storage id.
             lora.storage_id = storage_id
-            await self._upload_lora(storage_id, data)
+            uploads.append((storage_id, data))
+
+        limit = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+        async def upload(storage_id: str, data: bytes):
+            async with limit:
+                await self._upload_lora(storage_id, data)
+
+        await asyncio.gather(*(upload(sid, data) for sid, data in uploads))
 
     async def _upload_lora(self, storage_id: str, data: bytes) -> None:
         """Upload LoRA to temporary S3 storage via cloud API."""
@@ -459,8 +707,7 @@ class CloudClientManager:
             raise ValueError("Invalid upload URL for LoRA")
 
         # Use S3 checksum header with base64-encoded sha256 (storage_id).
-        async for _sent, _total in self._requests.upload(url, data, sha256=storage_id):
-            pass
+        await self._requests.upload(url, data, sha256=storage_id)
 
     async def _receive_images(self, images: dict) -> ImageData:
         """Download result images."""
@@ -469,16 +716,28 @@ class CloudClientManager:
             return ImageData([])
 
         if url := images.get("url"):
-            data = await self._requests.download(url)
-            return ImageData.from_bytes(data, offsets)
+            return await ImageData.from_chunks(self._requests.download_stream(url), offsets)
         elif b64 := images.get("base64"):
-            return ImageData.from_base64(b64, offsets)
+            # Inline results can be several MB, decode off the event loop
+            return await asyncio.to_thread(ImageData.from_base64, b64, offsets)
         else:
             raise ValueError("No result images found in server response")
 
     def get_job(self, job_id: str) -> CloudJobState | None:
         """Get job state by ID."""
-        return self._jobs.get(job_id)
+        job = self._jobs.get(job_id)
+        link = self._batch_members.get(job_id)
+        if job is not None and link is not None and not job.cancel_requested:
+            batch_id, offset, count = link
+            batch = self._jobs.get(batch_id)
+            if batch is not None:
+                job.status = batch.status
+                job.progress = batch.progress
+                job.error = batch.error
+                job.payment_required = batch.payment_required
+                job.images = batch.images[offset:offset + count]
+                job.finished_at = batch.finished_at
+        return job
 
     async def cancel(self, job_id: str) -> bool:
         """
@@ -494,28 +753,68 @@ class CloudClientManager:
         if not job:
             return False
 
-        job.cancel_requested = True
+        link = self._batch_members.get(job_id)
+        if link is not None:
+            # The shared batch is only cancelled once every member gave up on it
+            job.cancel_event.set()
+            job.status = CloudJobStatus.cancelled
+            job.finished_at = time.monotonic()
+            batch_id = link[0]
+            if all(
+                self._jobs[member_id].cancel_requested
+                for member_id, (other_id, _, _) in self._batch_members.items()
+                if other_id == batch_id and member_id in self._jobs
+            ):
+                return await self.cancel(batch_id)
+            return True
+
+        job.cancel_event.set()
 
         # If we already have remote identifiers, request remote cancellation as well.
-        if job.remote_id and job.worker_id:
-            try:
-                await self._post(f"cancel/{job.worker_id}/{job.remote_id}", {})
-            except Exception:
-                # If remote cancel fails, still mark local job as cancelled.
-                # The status polling loop will stop on cancel_requested.
-                pass
+        await self._cancel_remote(job)
 
         job.status = CloudJobStatus.cancelled
+        if job.finished_at is None:
+            job.finished_at = time.monotonic()
         return True
 
-    def get_job_images(self, job_id: str) -> list[bytes]:
+    async def _cancel_remote(self, job: CloudJobState):
+        """Request cancellation of a submitted job on the server, at most once."""
+        if job.remote_cancelled or not (job.remote_id and job.worker_id):
+            return
+        job.remote_cancelled = True
+        try:
+            await self._post(f"cancel/{job.worker_id}/{job.remote_id}", {})
+        except Exception:
+            # If remote cancel fails, still mark local job as cancelled.
+            # The status polling loop will stop on cancel_requested.
+            pass
+
+    def get_job_images(self, job_id: str) -> list[ImageBytes]:
         """Get images for a completed job."""
-        job = self._jobs.get(job_id)
+        job = self.get_job(job_id)
         if job and job.status == CloudJobStatus.finished:
             return job.images
         return []
 
 
+def _content_digest(data: bytes | bytearray | memoryview) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _poll_delay(
+    status: str, progress: float, previous: float, interval: float = POLL_INTERVAL
+) -> float:
+    """Delay before the next status poll.
+
+    Queued jobs change rarely, so back off while they wait. Running jobs are
+    polled more often as they approach completion.
+    """
+    if status == "in_queue":
+        return min(previous * 1.5, MAX_QUEUE_POLL_INTERVAL)
+    return max(0.2, min(interval, 1.0 - progress))
+
+
 def _apply_limits(work: WorkflowInput, features: CloudFeatures):
     """Apply cloud service limits to workflow (same as krita-ai-diffusion)."""
     if work.models:
@@ -3,12 +3,17 @@ Simplified types for cloud service, without Qt dependency.
 These replace Qt-dependent types from shared/client.py and shared/image.py.
 """
 
+import asyncio
+import binascii
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import NamedTuple
+from typing import AsyncIterator, NamedTuple
 
+# Encoded image data. Images split from a downloaded blob are zero-copy views.
+ImageBytes = bytes | memoryview
 
-@dataclass
+
+@dataclass(slots=True)
 class CloudUser:
     """Simplified User, no Qt dependency."""
 
@@ -25,7 +30,7 @@ class CloudNews(NamedTuple):
     digest: str
 
 
-@dataclass
+@dataclass(slots=True)
 class CloudFeatures:
     """Features available from cloud service."""
 
@@ -35,7 +40,7 @@ class CloudFeatures:
     max_control_layers: int = 4
 
 
-@dataclass
+@dataclass(slots=True)
 class CloudPaymentRequired:
     """Structured payload for 402 Payment Required errors."""
 
@@ -57,20 +62,27 @@ class CloudJobStatus(str, Enum):
     timed_out = "timed_out"
 
 
-@dataclass
+@dataclass(slots=True)
 class CloudJobState:
     """Cloud job state tracking."""
 
     status: CloudJobStatus = CloudJobStatus.queued
     progress: float = 0.0
-    images: list[bytes] = field(default_factory=list)
+    images: list[ImageBytes] = field(default_factory=list)
     error: str | None = None
     payment_required: CloudPaymentRequired | None = None
     # Remote identifiers returned by cloud API (needed for cancellation)
     remote_id: str | None = None
     worker_id: str | None = None
-    # Cancellation requested by client
-    cancel_requested: bool = False
+    remote_cancelled: bool = False
+    # time.monotonic() when the job stopped running, retention counts from here
+    finished_at: float | None = field(default=None, repr=False, compare=False)
+    # Set when the client requests cancellation, wakes up waiting pollers
+    cancel_event: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.cancel_event.is_set()
 
 
 class ImageData:
@@ -79,13 +91,15 @@ class ImageData:
     Replaces Qt's QImage-based ImageCollection.
     """
 
-    def __init__(self, images: list[bytes]):
+    __slots__ = ("images",)
+
+    def __init__(self, images: list[ImageBytes]):
         self.images = images
 
     def __len__(self):
         return len(self.images)
 
-    def __getitem__(self, index: int) -> bytes:
+    def __getitem__(self, index: int) -> ImageBytes:
         return self.images[index]
 
     def __iter__(self):
@@ -96,6 +110,8 @@ class ImageData:
         """
         Extract images from concatenated bytes using offsets.
 
+        Images are memoryview slices of data, they keep it alive without copying.
+
         Args:
             data: Concatenated image bytes
             offsets: List of byte offsets where each image starts
@@ -103,13 +119,53 @@ class ImageData:
         Returns:
             ImageData containing extracted images
         """
-        images = []
+        view = memoryview(data)
+        images: list[ImageBytes] = []
         for i, offset in enumerate(offsets):
             if i + 1 < len(offsets):
                 end = offsets[i + 1]
             else:
                 end = len(data)
-            images.append(data[offset:end])
+            images.append(view[offset:end])
+        return ImageData(images)
+
+    @staticmethod
+    async def from_chunks(chunks: AsyncIterator[bytes], offsets: list[int]) -> "ImageData":
+        """
+        Extract images from a stream of concatenated bytes using offsets.
+
+        Images are split off while the data arrives, so the complete
+        concatenated buffer is never held in memory.
+
+        Args:
+            chunks: Async iterator over the concatenated image bytes
+            offsets: List of byte offsets where each image starts
+
+        Returns:
+            ImageData containing extracted images
+        """
+        images: list[bytes] = []
+        current: bytearray | None = None  # image being filled, None before the first offset
+        started = 0  # number of offsets reached so far
+        pos = 0  # stream position of the current chunk
+        async for chunk in chunks:
+            view = memoryview(chunk)
+            i = 0
+            while started < len(offsets) and offsets[started] < pos + len(view):
+                cut = max(offsets[started] - pos, i)
+                if current is not None:
+                    current += view[i:cut]
+                    images.append(bytes(current))
+                current = bytearray()
+                started += 1
+                i = cut
+            if current is not None:
+                current += view[i:]
+            pos += len(view)
+        if current is not None:
+            images.append(bytes(current))
+        # Offsets past the end of the data yield empty images, like from_bytes
+        images.extend(b"" for _ in range(len(offsets) - started))
         return ImageData(images)
 
     @staticmethod
@@ -124,7 +180,5 @@ class ImageData:
         Returns:
             ImageData containing extracted images
         """
-        import base64
-
-        data = base64.b64decode(b64)
+        data = binascii.a2b_base64(b64)
         return ImageData.from_bytes(data, offsets)
@@ -4,16 +4,51 @@ Simplified ComfyClient implementation using aiohttp instead of PyQt5.
 Manages connection, job queue, and result storage.
 """
 import asyncio
-import json
-import struct
+import hashlib
+import random
+import time
 import uuid
 import logging
+from collections import OrderedDict
 from itertools import chain
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
 from typing import Optional
 
 import aiohttp
+import orjson
+
+from . import disk_cache
+from .batching import RequestCoalescer
+from .encoding import decode_base64
+from .ids import new_job_id
+from .upscaler import DEFAULT_UPSCALE_MODEL
+
+# Import shared modules that don't depend on Qt
+import src.path_setup  # noqa: F401
+
+from shared.api import (
+    WorkflowInput,
+    WorkflowKind,
+    ImageInput,
+    ExtentInput,
+    SamplingInput,
+    ConditioningInput,
+    CheckpointInput,
+)
+from shared.comfy_workflow import ComfyObjectInfo, ComfyRunMode
+from shared.image import Extent, Image
+from shared.resources import (
+    required_custom_nodes,
+    required_models,
+    default_checkpoints,
+    upscale_models,
+    optional_models,
+    ResourceKind,
+)
+from shared.workflow import create as create_workflow, prepare_upscale_simple
+from src.shared_shim.client import build_client_models, resolve_arch
+from src.shared_shim.files import FileLibrary
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +61,61 @@ class JobStatus(str, Enum):
     interrupted = "interrupted"
 
 
+_TERMINAL_STATUSES = (JobStatus.finished, JobStatus.error, JobStatus.interrupted)
+
 DEFAULT_CHECKPOINT = "v1-5-pruned-emaonly.safetensors"
 
+# Number of jobs kept in memory. Once exceeded, the least recently used
+# finished jobs (and their images) are dropped.
+MAX_JOBS = 256
+
+# Results of workflows with an explicit seed, reused when the same workflow
+# is submitted again (eg. after undo in Photoshop).
+MAX_CACHED_RESULTS = 32
+RESULT_CACHE_TTL = 1800  # seconds
+
+# Session default only bounds connecting, the websocket stays open indefinitely
+SESSION_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=10)
+CONNECT_TIMEOUT = aiohttp.ClientTimeout(total=5)
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+TRANSFER_TIMEOUT = aiohttp.ClientTimeout(total=60)
+LARGE_TRANSFER_TIMEOUT = aiohttp.ClientTimeout(total=120)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Websocket message types, bound once for the receive loop
+_WS_TEXT = aiohttp.WSMsgType.TEXT
+_WS_BINARY = aiohttp.WSMsgType.BINARY
+_WS_ERROR = aiohttp.WSMsgType.ERROR
+_WS_CLOSED = frozenset((
+    aiohttp.WSMsgType.CLOSE,
+    aiohttp.WSMsgType.CLOSING,
+    aiohttp.WSMsgType.CLOSED,
+))
+
+# Result images downloaded at the same time, across all jobs
+MAX_CONCURRENT_FETCHES = 8
+
+# Input images of one workflow uploaded at the same time
+MAX_CONCURRENT_UPLOADS = 4
+
+# Model info is paged by the ETN endpoint, pages after the first are fetched
+# concurrently
+MODEL_INFO_PAGE_SIZE = 8
+MAX_CONCURRENT_MODEL_INFO_PAGES = 8
+
+# Websocket reconnect delay doubles per failed attempt, up to the maximum
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 30.0
+
 
-@dataclass
+@dataclass(slots=True)
 class JobState:
     """State of a generation job."""
     status: JobStatus = JobStatus.queued
     progress: float = 0.0
-    images: list[bytes] = field(default_factory=list)
+    # Encoded images, downloaded results are views of their receive buffer
+    images: list[bytes | memoryview] = field(default_factory=list)
     error: Optional[str] = None
     node_count: int = 0
     sample_count: int = 0
@@ -43,8 +124,14 @@ class JobState:
     # For multi-image generation
     batch_size: int = 1
     seed: int = 0  # Starting seed, each image uses seed + index
-
-
+    # Key of the result cache entry to fill once the job finished
+    result_key: Optional[str] = None
+    # Cancelled by its own client while joined jobs still wait for the prompt
+    owner_cancelled: bool = False
+    # Background POST of the prompt, see ComfyClientManager.wait_submitted
+    submitted: Optional[asyncio.Task] = field(default=None, repr=False, compare=False)
+    # Set once the job reached a final status, see ComfyClientManager.wait
+    done_event: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
 
 
 class ComfyClientManager:
@@ -52,19 +139,45 @@ class ComfyClientManager:
 
     def __init__(self):
         self.url: str = ""
+        self._urls: dict[str, str] = {}
         self.client_id: str = str(uuid.uuid4())
-        self.jobs: dict[str, JobState] = {}
+        # Ordered by last access, see _add_job and get_job
+        self.jobs: OrderedDict[str, JobState] = OrderedDict()
         self._session: Optional[aiohttp.ClientSession] = None
         self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
         self._listener_task: Optional[asyncio.Task] = None
         self._is_connected: bool = False
         self._auth_token: Optional[str] = None
         self._object_info: Optional[dict] = None
+        # Identifies the server build, object_info cached on disk is only
+        # reused while it matches. Set from /system_stats on connect.
+        self._server_version: Optional[str] = None
+        self._object_info_from_disk = False
         self._supports_etn: Optional[bool] = None
         self._models = None
         self._missing_nodes: list[str] = []
         self._missing_required_models: list[str] = []
         self._missing_optional_models: list[str] = []
+        # Requests merged into a shared batch job: member id -> (batch id, offset, count)
+        self._batch_members: dict[str, tuple[str, int, int]] = {}
+        self._coalescer = RequestCoalescer(self._submit_batch, is_busy=self._has_active_jobs)
+        # Result image downloads per job, in output order
+        self._image_fetches: dict[str, list[asyncio.Task]] = {}
+        self._bg_tasks: set[asyncio.Task] = set()
+        self._fetch_slots = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        # Workflow digest -> (time stored, result images)
+        self._result_cache: OrderedDict[str, tuple[float, list[bytes | memoryview]]] = OrderedDict()
+        # Workflow digest -> id of the job currently generating it
+        self._running_results: dict[str, str] = {}
+        # WebSocket message type -> handler(job_id, job, data)
+        self._ws_handlers = {
+            "execution_start": self._on_execution_start,
+            "progress": self._on_progress,
+            "executing": self._on_executing,
+            "executed": self._on_executed,
+            "execution_error": self._on_execution_error,
+            "execution_interrupted": self._on_execution_interrupted,
+        }
 
     @property
     def is_connected(self) -> bool:
@@ -72,26 +185,28 @@ class ComfyClientManager:
 
     async def connect(self, url: str, auth_token: Optional[str] = None) -> bool:
         """Connect to ComfyUI server."""
-        self.url = url.rstrip("/")
-        self._auth_token = auth_token
+        # Stop the listener of a previous connection, but keep the session
+        # (and its pooled keep-alive connections) when possible.
+        await self._stop_listener()
 
-        try:
-            # Create session with optional auth
-            headers = {}
-            if auth_token:
-                headers["Authorization"] = f"Bearer {auth_token}"
+        self._set_url(url)
 
-            self._session = aiohttp.ClientSession(headers=headers)
+        try:
+            await self._ensure_session(auth_token)
 
             # Test connection
-            async with self._session.get(f"{self.url}/system_stats", timeout=5) as resp:
+            async with self._session.get(self._urls["system_stats"], timeout=CONNECT_TIMEOUT) as resp:
                 if resp.status != 200:
                     raise Exception(f"Failed to connect: status {resp.status}")
-                data = await resp.json()
+                data = orjson.loads(await resp.read())
                 logger.info(f"Connected to ComfyUI: {data.get('devices', [])}")
+                self._server_version = _server_version(data)
 
             # Validate environment and load models for shared workflow
             await self._refresh_shared_models()
+            if self._object_info_from_disk:
+                # Pick up nodes and models added since the disk copy was made
+                self._spawn(self._revalidate_object_info())
 
             # Start WebSocket listener
             self._listener_task = asyncio.create_task(self._listen_websocket())
@@ -104,8 +219,54 @@ class ComfyClientManager:
             await self.disconnect()
             raise
 
-    async def disconnect(self):
-        """Disconnect from ComfyUI server."""
+    def _set_url(self, url: str) -> None:
+        """Set the server URL and precompute the endpoint URLs used per request."""
+        self.url = url.rstrip("/")
+        ws_url = self.url.replace("http", "ws", 1)
+        self._urls = {
+            "system_stats": f"{self.url}/system_stats",
+            "object_info": f"{self.url}/object_info",
+            "prompt": f"{self.url}/prompt",
+            "queue": f"{self.url}/queue",
+            "view": f"{self.url}/view",
+            "ws": f"{ws_url}/ws?clientId={self.client_id}",
+        }
+
+    async def _ensure_session(self, auth_token: Optional[str]) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use.
+
+        The session is reused across reconnects so that subsequent requests
+        ride on pooled keep-alive connections instead of paying a fresh
+        TCP/TLS handshake. It is only recreated when the auth token changes,
+        since the token is part of the session default headers.
+        """
+        if self._session and not self._session.closed:
+            if auth_token == self._auth_token:
+                return self._session
+            await self._session.close()
+
+        headers = {}
+        if auth_token:
+            headers[aiohttp.hdrs.AUTHORIZATION] = f"Bearer {auth_token}"
+
+        connector = aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=32,
+            ttl_dns_cache=300,
+            keepalive_timeout=75,
+        )
+        self._session = aiohttp.ClientSession(
+            headers=headers,
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            timeout=SESSION_TIMEOUT,
+            json_serialize=_json_dumps,
+        )
+        self._auth_token = auth_token
+        return self._session
+
+    async def _stop_listener(self):
+        """Stop the WebSocket listener task if one is running."""
         self._is_connected = False
 
         if self._listener_task:
@@ -120,6 +281,16 @@ class ComfyClientManager:
             await self._ws.close()
             self._ws = None
 
+    async def disconnect(self):
+        """Disconnect from ComfyUI server and release the HTTP session."""
+        await self._stop_listener()
+
+        # Pending submits and downloads need the session, stop them first
+        for task in self._bg_tasks:
+            task.cancel()
+        await asyncio.gather(*self._bg_tasks, return_exceptions=True)
+        self._image_fetches.clear()
+
         if self._session:
             await self._session.close()
             self._session = None
@@ -179,33 +350,14 @@ class ComfyClientManager:
         """Enqueue a job using shared workflow and ETN nodes."""
         await self._require_shared_nodes()
 
-        import base64
-        import random
-        import src.path_setup  # noqa: F401
-
-        from shared.api import (
-            WorkflowInput,
-            WorkflowKind,
-            ImageInput,
-            ExtentInput,
-            SamplingInput,
-            ConditioningInput,
-            CheckpointInput,
-        )
-        from shared.image import Extent, Image
-        from shared.workflow import create as create_workflow
-        from shared.comfy_workflow import ComfyRunMode
-        from src.shared_shim.client import resolve_arch
-
-        actual_seed = seed if seed >= 0 else random.randint(0, 2**31 - 1)
+        actual_seed = seed if seed >= 0 else random.getrandbits(31)
         ckpt_name = checkpoint or DEFAULT_CHECKPOINT
         arch = resolve_arch(ckpt_name)
 
         if self._models is None:
             await self._refresh_shared_models()
         assert self._models is not None
-        if ckpt_name not in self._models.checkpoints:
-            raise RuntimeError(f"Checkpoint not found: {ckpt_name}")
+        await self._require_checkpoint(ckpt_name)
 
         extent = Extent(width, height)
         extent_input = ExtentInput(
@@ -219,8 +371,7 @@ class ComfyClientManager:
         images = ImageInput(extent=extent_input)
         if image and strength < 1.0:
             kind = WorkflowKind.refine
-            image_b64 = image.split(",", 1)[1] if "," in image else image
-            image_bytes = base64.b64decode(image_b64)
+            image_bytes = decode_base64(image)
             images.initial_image = Image.from_bytes(image_bytes)
 
         sampling = SamplingInput(
@@ -246,60 +397,140 @@ class ComfyClientManager:
             batch_count=batch_size,
         )
 
+        if seed < 0:
+            # Random seed: may share one ComfyUI batch with identical requests
+            key = (
+                prompt, negative_prompt, width, height, steps, cfg_scale,
+                ckpt_name, sampler, scheduler, image, strength,
+            )
+            return await self.enqueue_workflow_batched(key, work, batch_size=batch_size)
         return await self.enqueue_workflow(work, batch_size=batch_size, seed=actual_seed)
 
     async def _get_object_info(self) -> dict | None:
-        """Fetch ComfyUI /object_info and cache it."""
+        """Fetch ComfyUI /object_info and cache it.
+
+        The response is also stored on disk, and reused by later processes
+        while the server reports the same version.
+        """
         if self._object_info is not None:
             return self._object_info
+        path = disk_cache.cache_path("object_info", self.url)
+        if self._server_version is not None:
+            cached = await asyncio.to_thread(disk_cache.read_json, path)
+            if cached and cached.get("version") == self._server_version:
+                self._object_info = cached["data"]
+                self._object_info_from_disk = True
+                return self._object_info
+        return await self._fetch_object_info()
+
+    async def _fetch_object_info(self) -> dict | None:
+        """Fetch /object_info from the server, replacing memory and disk cache."""
         if not self._session:
             return None
         try:
             async with self._session.get(
-                f"{self.url}/object_info",
-                timeout=30,
+                self._urls["object_info"],
+                timeout=REQUEST_TIMEOUT,
             ) as resp:
                 if resp.status == 200:
-                    self._object_info = await resp.json()
+                    body = await resp.read()
+                    self._object_info = await asyncio.to_thread(orjson.loads, body)
+                    self._object_info_from_disk = False
+                    if self._server_version is not None:
+                        path = disk_cache.cache_path("object_info", self.url)
+                        entry = {"version": self._server_version, "data": self._object_info}
+                        await asyncio.to_thread(disk_cache.write_json, path, entry)
                     return self._object_info
         except Exception as e:
             logger.debug("Failed to fetch object_info: %s", e)
         return None
 
+    async def _reload_object_info(self) -> bool:
+        """Replace object_info loaded from disk with the server's current one.
+
+        Installing nodes or models does not change the server version, so
+        callers retry with live data once before reporting anything missing.
+        Returns False if the data is live already or could not be fetched.
+        """
+        if not self._object_info_from_disk:
+            return False
+        return await self._fetch_object_info() is not None
+
+    async def _revalidate_object_info(self) -> None:
+        """Refresh models from live object_info after connecting with a disk copy."""
+        if not await self._reload_object_info():
+            return
+        try:
+            await self._refresh_shared_models()
+        except Exception as e:
+            logger.warning("Shared workflow models changed: %s", e)
+
+    async def _require_checkpoint(self, name: str) -> None:
+        """Raise if the server has no checkpoint of this name.
+
+        Model files can be added without a server update, so object_info
+        loaded from disk is fetched again before giving up.
+        """
+        assert self._models is not None
+        if name in self._models.checkpoints:
+            return
+        if await self._reload_object_info():
+            await self._refresh_shared_models()
+            if name in self._models.checkpoints:
+                return
+        raise RuntimeError(f"Checkpoint not found: {name}")
+
     async def _get_model_info(self, folder_name: str) -> dict | None:
         """Fetch model info via ETN endpoint if available."""
         if not self._session:
             return None
         try:
-            offset = 0
-            total = 100
-            results: dict = {}
-            while offset < total:
-                async with self._session.get(
-                    f"{self.url}/api/etn/model_info/{folder_name}?offset={offset}&limit=8",
-                    timeout=30,
-                ) as resp:
-                    if resp.status != 200:
-                        return None
-                    data = await resp.json()
-                    if "_meta" not in data:
-                        return data
-                    total = data["_meta"]["total"]
-                    del data["_meta"]
-                    results.update(data)
-                    offset += 8
+            results = await self._get_model_info_page(folder_name, 0)
+            if results is None or "_meta" not in results:
+                return results
+            total = results.pop("_meta")["total"]
+
+            # The first page tells the total, fetch the others concurrently
+            slots = asyncio.Semaphore(MAX_CONCURRENT_MODEL_INFO_PAGES)
+
+            async def fetch_page(offset: int):
+                async with slots:
+                    return await self._get_model_info_page(folder_name, offset)
+
+            pages = await asyncio.gather(*(
+                fetch_page(offset)
+                for offset in range(MODEL_INFO_PAGE_SIZE, total, MODEL_INFO_PAGE_SIZE)
+            ))
+            for page in pages:
+                if page is None:
+                    return None
+                page.pop("_meta", None)
+                results.update(page)
             return results
         except Exception:
             return None
 
+    async def _get_model_info_page(self, folder_name: str, offset: int) -> dict | None:
+        assert self._session is not None
+        async with self._session.get(
+            f"{self.url}/api/etn/model_info/{folder_name}",
+            params={"offset": offset, "limit": MODEL_INFO_PAGE_SIZE},
+            timeout=REQUEST_TIMEOUT,
+        ) as resp:
+            if resp.status != 200:
+                return None
+            return orjson.loads(await resp.read())
+
     @staticmethod
     def _compute_missing_nodes(nodes, required_custom_nodes) -> list[str]:
-        missing = []
-        for node in required_custom_nodes:
-            for name in node.nodes:
-                if name not in nodes:
-                    missing.append(name)
-        return sorted(set(missing))
+        # ComfyObjectInfo membership is a dict lookup on the node classes
+        missing = {
+            name
+            for node in required_custom_nodes
+            for name in node.nodes
+            if name not in nodes
+        }
+        return sorted(missing)
 
     @staticmethod
     def _compute_missing_models(
@@ -310,23 +541,24 @@ class ComfyClientManager:
         optional_models,
         ResourceKind,
     ) -> tuple[list[str], list[str]]:
-        missing_required = []
-        for model in chain(required_models, default_checkpoints, upscale_models):
-            if model.id.kind is ResourceKind.checkpoint:
-                if model.filename not in models.checkpoints:
-                    missing_required.append(model.id.string)
-            elif models.find(model.id) is None:
-                missing_required.append(model.id.string)
-
-        missing_optional = []
-        for model in optional_models:
-            if model.id.kind is ResourceKind.checkpoint:
-                if model.filename not in models.checkpoints:
-                    missing_optional.append(model.id.string)
-            elif models.find(model.id) is None:
-                missing_optional.append(model.id.string)
-
-        return sorted(set(missing_required)), sorted(set(missing_optional))
+        checkpoints = models.checkpoints
+
+        def missing(resources) -> list[str]:
+            # Checkpoints are keyed by filename, other resources by id
+            return sorted({
+                model.id.string
+                for model in resources
+                if (
+                    model.filename not in checkpoints
+                    if model.id.kind is ResourceKind.checkpoint
+                    else models.find(model.id) is None
+                )
+            })
+
+        return (
+            missing(chain(required_models, default_checkpoints, upscale_models)),
+            missing(optional_models),
+        )
 
     async def get_diagnostics(self) -> dict:
         """Collect missing node/model diagnostics for shared workflow."""
@@ -339,19 +571,6 @@ class ComfyClientManager:
                 "missing_optional_models": [],
             }
 
-        import src.path_setup  # noqa: F401
-
-        from shared.comfy_workflow import ComfyObjectInfo
-        from shared.resources import (
-            required_custom_nodes,
-            required_models,
-            default_checkpoints,
-            upscale_models,
-            optional_models,
-            ResourceKind,
-        )
-        from src.shared_shim.client import build_client_models
-
         object_info = await self._get_object_info()
         if not object_info:
             return {
@@ -365,8 +584,10 @@ class ComfyClientManager:
         nodes = ComfyObjectInfo(object_info)
         missing_nodes = self._compute_missing_nodes(nodes, required_custom_nodes)
 
-        checkpoints_info = await self._get_model_info("checkpoints")
-        diffusion_info = await self._get_model_info("diffusion_models")
+        checkpoints_info, diffusion_info = await asyncio.gather(
+            self._get_model_info("checkpoints"),
+            self._get_model_info("diffusion_models"),
+        )
         models = build_client_models(nodes, checkpoints_info, diffusion_info)
         missing_required, missing_optional = self._compute_missing_models(
             models,
@@ -385,20 +606,6 @@ class ComfyClientManager:
         }
 
     async def _refresh_shared_models(self) -> None:
-        import src.path_setup  # noqa: F401
-
-        from shared.comfy_workflow import ComfyObjectInfo
-        from shared.resources import (
-            required_custom_nodes,
-            required_models,
-            default_checkpoints,
-            upscale_models,
-            optional_models,
-            ResourceKind,
-        )
-        from src.shared_shim.client import build_client_models
-        from src.shared_shim.files import FileLibrary
-
         object_info = await self._get_object_info()
         if not object_info:
             raise RuntimeError("ComfyUI /object_info is unavailable.")
@@ -406,6 +613,8 @@ class ComfyClientManager:
         nodes = ComfyObjectInfo(object_info)
         missing_nodes = self._compute_missing_nodes(nodes, required_custom_nodes)
         self._missing_nodes = missing_nodes
+        if missing_nodes and await self._reload_object_info():
+            return await self._refresh_shared_models()
         if missing_nodes:
             missing_list = ", ".join(missing_nodes)
             raise RuntimeError(
@@ -413,8 +622,10 @@ class ComfyClientManager:
                 f"{missing_list}. Install required custom nodes."
             )
 
-        checkpoints_info = await self._get_model_info("checkpoints")
-        diffusion_info = await self._get_model_info("diffusion_models")
+        checkpoints_info, diffusion_info = await asyncio.gather(
+            self._get_model_info("checkpoints"),
+            self._get_model_info("diffusion_models"),
+        )
         self._models = build_client_models(nodes, checkpoints_info, diffusion_info)
 
         library = FileLibrary.instance()
@@ -431,6 +642,8 @@ class ComfyClientManager:
         )
         self._missing_required_models = missing_required
         self._missing_optional_models = missing_optional
+        if missing_required and await self._reload_object_info():
+            return await self._refresh_shared_models()
         if missing_required:
             missing_list = ", ".join(missing_required)
             raise RuntimeError(f"Missing required models: {missing_list}")
@@ -451,7 +664,9 @@ class ComfyClientManager:
                 "ComfyUI /object_info is unavailable. Shared-only workflow requires comfyui-tooling-nodes."
             )
         required = {"ETN_LoadImageCache", "ETN_SaveImageCache"}
-        missing = required.difference(set(info.keys()))
+        missing = required.difference(info.keys())
+        if missing and await self._reload_object_info():
+            return await self._require_shared_nodes()
         if missing:
             missing_list = ", ".join(sorted(missing))
             raise RuntimeError(
@@ -464,11 +679,13 @@ class ComfyClientManager:
         """Upload input images for ETN_LoadImageCache."""
         if not image_data or not self._session:
             return
-        for image_id, data in image_data.items():
-            async with self._session.put(
+        slots = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+
+        async def upload(image_id: str, data: bytes):
+            async with slots, self._session.put(
                 f"{self.url}/api/etn/image/{image_id}",
                 data=data,
-                timeout=60,
+                timeout=TRANSFER_TIMEOUT,
             ) as resp:
                 if resp.status >= 400:
                     error_text = await resp.text()
@@ -476,13 +693,15 @@ class ComfyClientManager:
                         f"Failed to upload ETN image {image_id}: {error_text}"
                     )
 
+        await asyncio.gather(*(upload(image_id, data) for image_id, data in image_data.items()))
+
     async def _fetch_etn_image(self, image_id: str) -> bytes | None:
         """Fetch an ETN cached image by id."""
         if not self._session:
             return None
         async with self._session.get(
             f"{self.url}/api/etn/image/{image_id}",
-            timeout=120,
+            timeout=LARGE_TRANSFER_TIMEOUT,
         ) as resp:
             if resp.status == 200:
                 return await resp.read()
@@ -493,8 +712,13 @@ class ComfyClientManager:
         work,
         batch_size: int = 1,
         seed: int = 0,
+        use_cache: bool = True,
     ) -> str:
-        """Submit a prepared WorkflowInput using shared workflow."""
+        """Submit a prepared WorkflowInput using shared workflow.
+
+        If the identical workflow finished recently its images are reused,
+        pass ``use_cache=False`` for workflows with a random seed.
+        """
         if not self._session or not self._is_connected:
             raise Exception("Not connected to ComfyUI")
 
@@ -503,59 +727,190 @@ class ComfyClientManager:
             await self._refresh_shared_models()
         assert self._models is not None
 
-        from shared.api import CheckpointInput
-        from shared.comfy_workflow import ComfyRunMode
-        from shared.workflow import create as create_workflow
-        from src.shared_shim.client import resolve_arch
-
         if work.models is None or not work.models.checkpoint:
             work.models = CheckpointInput(
                 checkpoint=DEFAULT_CHECKPOINT,
                 version=resolve_arch(DEFAULT_CHECKPOINT),
             )
 
-        if work.models.checkpoint not in self._models.checkpoints:
-            raise RuntimeError(f"Checkpoint not found: {work.models.checkpoint}")
+        await self._require_checkpoint(work.models.checkpoint)
+
+        # Building the graph encodes input images, keep it off the event loop
+        workflow, prompt_json = await asyncio.to_thread(_build_prompt, work, self._models)
+        job_id = new_job_id()
+        result_key = _workflow_digest(prompt_json) if use_cache else None
+        if result_key is not None and (images := self._cached_result(result_key)):
+            self._add_job(job_id, JobState(
+                status=JobStatus.finished,
+                progress=1.0,
+                images=list(images),
+                batch_size=batch_size,
+                seed=seed,
+            ))
+            logger.info("Job %s reused cached result", job_id)
+            return job_id
+        if result_key is not None and (running_id := self._running_results.get(result_key)):
+            running = self.jobs.get(running_id)
+            if running is not None and running.status in (JobStatus.queued, JobStatus.executing):
+                # Same workflow is already being generated, follow that job
+                self._add_job(job_id, JobState(
+                    status=running.status,
+                    batch_size=batch_size,
+                    seed=seed,
+                ))
+                self._batch_members[job_id] = (running_id, 0, batch_size)
+                logger.info("Job %s joined running job %s", job_id, running_id)
+                return job_id
 
-        workflow = create_workflow(work, self._models, comfy_mode=ComfyRunMode.server)
         await self._upload_etn_images(workflow.image_data)
 
-        job_id = str(uuid.uuid4())
         sample_count = workflow.sample_count or workflow.guess_sample_count()
-        data = {
-            "prompt": workflow.root,
-            "client_id": self.client_id,
-            "prompt_id": job_id,
-        }
+        self._submit_prompt(job_id, prompt_json, JobState(
+            status=JobStatus.queued,
+            node_count=len(workflow.root),
+            sample_count=sample_count,
+            batch_size=batch_size,
+            seed=seed,
+            result_key=result_key,
+        ))
+        if result_key is not None:
+            self._running_results[result_key] = job_id
+        return job_id
+
+    def _cached_result(self, key: str) -> list[bytes | memoryview] | None:
+        entry = self._result_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, images = entry
+        if time.monotonic() - stored_at > RESULT_CACHE_TTL:
+            del self._result_cache[key]
+            return None
+        self._result_cache.move_to_end(key)
+        return images
+
+    def _cache_result(self, key: str, images: list[bytes | memoryview]) -> None:
+        self._result_cache[key] = (time.monotonic(), list(images))
+        self._result_cache.move_to_end(key)
+        while len(self._result_cache) > MAX_CACHED_RESULTS:
+            self._result_cache.popitem(last=False)
+
+    def _release_result_key(self, job_id: str, job: JobState) -> None:
+        """Stop routing identical workflows to a job which is no longer running."""
+        key = job.result_key
+        if key is not None and self._running_results.get(key) == job_id:
+            del self._running_results[key]
+
+    async def enqueue_workflow_batched(self, key, work, batch_size: int = 1) -> str:
+        """Submit a WorkflowInput, merging it with identical concurrent requests.
+
+        Only use this for requests with a random seed; requests sharing ``key``
+        must produce the same workflow apart from the seed. Returns a job id
+        which only exposes the images belonging to this request.
+        """
+        batch_id, offset = await self._coalescer.enqueue(key, work, batch_size)
+        batch = self.jobs[batch_id]
+        if offset == 0 and batch.batch_size == batch_size:
+            return batch_id
+
+        job_id = new_job_id()
+        self._add_job(job_id, JobState(
+            status=batch.status,
+            batch_size=batch_size,
+            seed=batch.seed + offset,
+        ))
+        self._batch_members[job_id] = (batch_id, offset, batch_size)
+        return job_id
+
+    async def _submit_batch(self, work, batch_size: int) -> str:
+        work.batch_count = batch_size
+        seed = work.sampling.seed if work.sampling else 0
+        return await self.enqueue_workflow(
+            work, batch_size=batch_size, seed=seed, use_cache=False
+        )
 
-        async with self._session.post(
-            f"{self.url}/prompt",
-            json=data,
-            timeout=30,
-        ) as resp:
-            if resp.status != 200:
-                error_text = await resp.text()
-                raise Exception(f"Failed to submit job: {error_text}")
-            result = await resp.json()
-            if result.get("prompt_id") != job_id:
-                logger.warning(
-                    "Prompt ID mismatch: expected %s, got %s",
-                    job_id,
-                    result.get("prompt_id"),
-                )
-            self.jobs[job_id] = JobState(
-                status=JobStatus.queued,
-                node_count=len(workflow.root),
-                sample_count=sample_count,
-                batch_size=batch_size,
-                seed=seed,
-            )
-            logger.info("Shared workflow job %s submitted successfully", job_id)
-            return job_id
+    def _has_active_jobs(self) -> bool:
+        # Members are only synced when polled, their batch tells whether they are done
+        return any(
+            job.status in (JobStatus.queued, JobStatus.executing)
+            for job_id, job in self.jobs.items()
+            if job_id not in self._batch_members
+        )
+
+    def _add_job(self, job_id: str, job: JobState) -> None:
+        """Register a job, dropping the least recently used finished jobs
+        once more than MAX_JOBS are stored."""
+        self.jobs[job_id] = job
+        if job.status in _TERMINAL_STATUSES:
+            job.done_event.set()
+        excess = len(self.jobs) - MAX_JOBS
+        if excess <= 0:
+            return
+        stale = [
+            other_id
+            for other_id, other in self.jobs.items()
+            if self._sync_member(other_id, other).status in _TERMINAL_STATUSES
+        ][:excess]
+        for other_id in stale:
+            # Members of a batch take over their images before it is dropped
+            members = [m for m, link in self._batch_members.items() if link[0] == other_id]
+            for member_id in members:
+                self._sync_member(member_id, self.jobs[member_id])
+                del self._batch_members[member_id]
+            self._batch_members.pop(other_id, None)
+            del self.jobs[other_id]
 
     def get_job(self, job_id: str) -> Optional[JobState]:
         """Get job state by ID."""
-        return self.jobs.get(job_id)
+        job = self.jobs.get(job_id)
+        if job is not None:
+            self.jobs.move_to_end(job_id)
+            self._sync_member(job_id, job)
+            if job.owner_cancelled:
+                # The prompt ran on for joined jobs, see cancel
+                return replace(job, status=JobStatus.interrupted, images=[])
+        return job
+
+    def _sync_member(self, job_id: str, job: JobState) -> JobState:
+        """Copy the state of the shared batch to a job which is part of it."""
+        link = self._batch_members.get(job_id)
+        if link is not None and job.status != JobStatus.interrupted:
+            batch_id, offset, count = link
+            batch = self.jobs.get(batch_id)
+            if batch is not None:
+                job.status = batch.status
+                job.progress = batch.progress
+                job.error = batch.error
+                job.images = batch.images[offset:offset + count]
+        return job
+
+    async def wait(self, job_id: str, timeout: float | None = None) -> Optional[JobState]:
+        """Wait until a job is finished, failed or interrupted and return it.
+
+        Returns None for unknown jobs. Raises TimeoutError if the job is
+        still running after timeout seconds.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job.owner_cancelled:
+            return self.get_job(job_id)
+        events = [job.done_event]
+        link = self._batch_members.get(job_id)
+        if link is not None and (batch := self.jobs.get(link[0])) is not None:
+            # Members follow the shared job, unless they are cancelled themselves
+            events.append(batch.done_event)
+        if not any(event.is_set() for event in events):
+            waiters = [asyncio.ensure_future(event.wait()) for event in events]
+            try:
+                done, _ = await asyncio.wait(
+                    waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+            if not done:
+                raise TimeoutError(f"Job {job_id} did not finish in time")
+        return self.get_job(job_id)
 
     async def enqueue_upscale(
         self,
@@ -569,15 +924,7 @@ class ComfyClientManager:
 
         await self._require_shared_nodes()
 
-        import base64
-        import src.path_setup  # noqa: F401
-
-        from shared.image import Image
-        from shared.workflow import prepare_upscale_simple
-        from .upscaler import DEFAULT_UPSCALE_MODEL
-
-        image_b64 = image_base64.split(",", 1)[1] if "," in image_base64 else image_base64
-        image_bytes = base64.b64decode(image_b64)
+        image_bytes = decode_base64(image_base64)
         image = Image.from_bytes(image_bytes)
 
         model_name = model or DEFAULT_UPSCALE_MODEL
@@ -599,57 +946,146 @@ class ComfyClientManager:
         if not self._session or not self._is_connected:
             raise Exception("Not connected to ComfyUI")
 
-        import uuid
-        import logging
-
-        logger = logging.getLogger(__name__)
+        job_id = new_job_id()
+        # Minimal job state tracking; progress is driven by websocket events.
+        self._submit_prompt(job_id, orjson.dumps(prompt), JobState(
+            status=JobStatus.queued,
+            node_count=len(prompt or {}),
+            sample_count=0,
+            batch_size=1,
+            seed=0,
+        ))
+        return job_id
+
+    def _submit_prompt(self, job_id: str, prompt_json: bytes, job: JobState) -> None:
+        """Register a job and POST its prompt in the background.
+
+        The job exists before the request is sent, so websocket events which
+        arrive ahead of the response are not lost. Submission errors are
+        reported through the job state.
+        """
+        self._add_job(job_id, job)
+        job.submitted = self._spawn(self._post_prompt(job_id, prompt_json, job))
 
-        job_id = str(uuid.uuid4())
-        data = {
-            "prompt": prompt,
-            "client_id": self.client_id,
-            "prompt_id": job_id,
-        }
+    async def _post_prompt(self, job_id: str, prompt_json: bytes, job: JobState) -> bool:
+        if job.status == JobStatus.interrupted:
+            # Cancelled before the request went out
+            return False
+        # The graph is already encoded, only the envelope is added here
+        data = b'{"prompt":%b,"client_id":%b,"prompt_id":%b}' % (
+            prompt_json,
+            orjson.dumps(self.client_id),
+            orjson.dumps(job_id),
+        )
+        try:
+            if not self._session:
+                raise Exception("Not connected to ComfyUI")
+            async with self._session.post(
+                self._urls["prompt"],
+                data=data,
+                headers=JSON_HEADERS,
+                timeout=REQUEST_TIMEOUT,
+            ) as resp:
+                if resp.status != 200:
+                    error_text = await resp.text()
+                    raise Exception(f"Failed to submit job: {error_text}")
+                result = orjson.loads(await resp.read())
+        except Exception as e:
+            logger.error("Failed to submit job %s: %s", job_id, e)
+            if job.status == JobStatus.queued:
+                job.status = JobStatus.error
+                job.error = str(e)
+                job.done_event.set()
+            self._release_result_key(job_id, job)
+            return False
 
-        async with self._session.post(
-            f"{self.url}/prompt",
-            json=data,
-            timeout=30,
-        ) as resp:
-            if resp.status != 200:
-                error_text = await resp.text()
-                raise Exception(f"Failed to submit custom workflow: {error_text}")
-            result = await resp.json()
-            if result.get("prompt_id") != job_id:
-                logger.warning(
-                    "Prompt ID mismatch: expected %s, got %s",
-                    job_id,
-                    result.get("prompt_id"),
-                )
-            # Minimal job state tracking; progress is driven by websocket events.
-            self.jobs[job_id] = JobState(
-                status=JobStatus.queued,
-                node_count=len(prompt or {}),
-                sample_count=0,
-                batch_size=1,
-                seed=0,
+        if result.get("prompt_id") != job_id:
+            logger.warning(
+                "Prompt ID mismatch: expected %s, got %s",
+                job_id,
+                result.get("prompt_id"),
             )
-            logger.info("Custom workflow job %s submitted successfully", job_id)
-            return job_id
+        logger.info("Job %s submitted successfully", job_id)
+        return True
+
+    async def wait_submitted(self, job_id: str) -> None:
+        """Wait until the prompt of a job was accepted by the server.
+
+        Raises if submission failed. Jobs are otherwise returned as soon as
+        they are queued locally.
+        """
+        job = self.jobs.get(job_id)
+        link = self._batch_members.get(job_id)
+        if link is not None:
+            job = self.jobs.get(link[0])
+        if job is None:
+            raise KeyError(job_id)
+        submitted = job.submitted is None or await asyncio.shield(job.submitted)
+        if not submitted and job.status == JobStatus.error:
+            raise Exception(job.error or "Failed to submit job")
 
     async def cancel(self, job_id: str) -> bool:
         """Cancel a job."""
         if not self._session:
             return False
 
+        link = self._batch_members.get(job_id)
+        if link is not None:
+            # The shared prompt is only cancelled once nobody is waiting for it
+            member = self.jobs[job_id]
+            member.status = JobStatus.interrupted
+            member.done_event.set()
+            batch_id = link[0]
+            batch = self.jobs.get(batch_id)
+            if batch is not None and batch.result_key is not None and not batch.owner_cancelled:
+                # Joined a job with an explicit seed, its own client still wants it
+                return True
+            if not self._has_live_members(batch_id):
+                return await self._cancel_prompt(batch_id)
+            return True
+
+        job = self.jobs.get(job_id)
+        if job is not None and job.result_key is not None and self._has_live_members(job_id):
+            # Jobs with the same explicit seed joined this one, keep the prompt
+            # running for them and only report the job itself as interrupted
+            job.owner_cancelled = True
+            return True
+        return await self._cancel_prompt(job_id)
+
+    def _has_live_members(self, batch_id: str) -> bool:
+        return any(
+            self.jobs[member_id].status != JobStatus.interrupted
+            for member_id, (other_id, _, _) in self._batch_members.items()
+            if other_id == batch_id
+        )
+
+    async def _cancel_prompt(self, job_id: str) -> bool:
+        """Delete a prompt from the ComfyUI queue."""
+        job = self.jobs.get(job_id)
+        if job is not None and job.submitted is not None:
+            # The prompt is posted in the background. Mark the job first so a
+            # pending POST is skipped, otherwise wait until the server has it.
+            if job.status not in _TERMINAL_STATUSES:
+                job.status = JobStatus.interrupted
+                job.done_event.set()
+                self._release_result_key(job_id, job)
+            task = job.submitted
+            if task.cancelled() or not await asyncio.shield(task):
+                return True
+
         try:
             async with self._session.post(
-                f"{self.url}/queue",
-                json={"delete": [job_id]}
+                self._urls["queue"],
+                data=orjson.dumps({"delete": [job_id]}),
+                headers=JSON_HEADERS,
+                timeout=REQUEST_TIMEOUT,
             ) as resp:
                 if resp.status == 200:
-                    if job_id in self.jobs:
-                        self.jobs[job_id].status = JobStatus.interrupted
+                    job = self.jobs.get(job_id)
+                    if job is not None and job.status not in _TERMINAL_STATUSES:
+                        job.status = JobStatus.interrupted
+                        job.done_event.set()
+                        self._release_result_key(job_id, job)
                     return True
         except Exception as e:
             logger.error(f"Failed to cancel job {job_id}: {e}")
@@ -658,133 +1094,164 @@ class ComfyClientManager:
 
     async def _listen_websocket(self):
         """Listen for WebSocket messages from ComfyUI."""
-        ws_url = self.url.replace("http", "ws", 1)
 
+        attempt = 0
+        receive_json = self._handle_ws_message
+        loads = orjson.loads
         while self._is_connected:
             try:
                 async with self._session.ws_connect(
-                    f"{ws_url}/ws?clientId={self.client_id}",
+                    self._urls["ws"],
                     max_msg_size=2**30,
                 ) as ws:
                     self._ws = ws
                     logger.info("WebSocket connected")
 
-                    async for msg in ws:
-                        if msg.type == aiohttp.WSMsgType.TEXT:
-                            await self._handle_ws_message(json.loads(msg.data))
-                        elif msg.type == aiohttp.WSMsgType.BINARY:
-                            await self._handle_ws_binary(msg.data)
-                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                    receive = ws.receive
+                    received = 0
+                    while True:
+                        msg = await receive()
+                        # receive() returns buffered frames without suspending,
+                        # yield regularly so other tasks run during bursts
+                        received += 1
+                        if received & 15 == 0:
+                            await asyncio.sleep(0)
+                        msg_type = msg.type
+                        if msg_type is _WS_BINARY:
+                            # Preview images, only final results are stored
+                            continue
+                        if msg_type is _WS_TEXT:
+                            attempt = 0
+                            await receive_json(loads(msg.data))
+                        elif msg_type is _WS_ERROR:
                             logger.error(f"WebSocket error: {ws.exception()}")
                             break
+                        elif msg_type in _WS_CLOSED:
+                            break
 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"WebSocket error: {e}")
-                if self._is_connected:
-                    await asyncio.sleep(1)  # Reconnect delay
+
+            if self._is_connected:
+                # Back off while the server keeps refusing or dropping the
+                # connection, jitter spreads out reconnects of several clients
+                delay = min(MAX_RECONNECT_DELAY, RECONNECT_DELAY * 2**attempt)
+                attempt = min(attempt + 1, 16)
+                await asyncio.sleep(delay + random.random() * 0.3)
 
     async def _handle_ws_message(self, msg: dict):
         """Handle a WebSocket JSON message."""
-        msg_type = msg.get("type")
-        data = msg.get("data", {})
-
-        if msg_type == "status":
-            # Connection status update
-            pass
-
-        elif msg_type == "execution_start":
-            job_id = data.get("prompt_id")
-            if job_id and job_id in self.jobs:
-                self.jobs[job_id].status = JobStatus.executing
-                self.jobs[job_id].progress = 0.0
-                logger.info(f"Job {job_id} started executing")
-
-        elif msg_type == "progress":
-            job_id = data.get("prompt_id")
-            if job_id and job_id in self.jobs:
-                job = self.jobs[job_id]
-                job.samples_done = data.get("value", 0)
-                max_val = data.get("max", job.sample_count)
-                if max_val > 0:
-                    job.progress = job.samples_done / max_val
-
-        elif msg_type == "executing":
-            job_id = data.get("prompt_id")
-            node = data.get("node")
-
-            if job_id and job_id in self.jobs:
-                if node is None:
-                    # Execution finished
-                    job = self.jobs[job_id]
-                    if job.status != JobStatus.error:
-                        job.status = JobStatus.finished
-                        job.progress = 1.0
-                        logger.info(f"Job {job_id} finished")
-                else:
-                    # Node executing
-                    self.jobs[job_id].nodes_done += 1
-
-        elif msg_type == "executed":
-            job_id = data.get("prompt_id")
-            if job_id and job_id in self.jobs:
-                # Check for output images
-                output = data.get("output", {})
-                images = output.get("images", [])
-                for img_info in images:
-                    await self._fetch_result_image(job_id, img_info)
-
-        elif msg_type == "execution_error":
-            job_id = data.get("prompt_id")
-            if job_id and job_id in self.jobs:
-                error = data.get("exception_message", "Unknown error")
-                self.jobs[job_id].status = JobStatus.error
-                self.jobs[job_id].error = error
-                logger.error(f"Job {job_id} failed: {error}")
-
-        elif msg_type == "execution_interrupted":
-            job_id = data.get("prompt_id")
-            if job_id and job_id in self.jobs:
-                self.jobs[job_id].status = JobStatus.interrupted
-                logger.info(f"Job {job_id} interrupted")
-
-    async def _handle_ws_binary(self, data: bytes):
-        """Handle binary WebSocket message (preview images)."""
-        # Binary messages contain preview images during generation
-        # Format: 4 bytes event type, 4 bytes format, rest is image data
-        if len(data) > 8:
-            event_type = struct.unpack(">I", data[0:4])[0]
-            img_format = struct.unpack(">I", data[4:8])[0]
-
-            # event_type 1 = preview image
-            if event_type == 1:
-                # We don't store preview images, only final results
-                pass
+        # Messages without a handler (eg. "status") carry no job updates
+        handler = self._ws_handlers.get(msg.get("type"))
+        if handler is None:
+            return
+        data = msg.get("data") or {}
+        job_id = data.get("prompt_id")
+        job = self.jobs.get(job_id)
+        # Events for cancelled or completed jobs must not revive them
+        if job is not None and job.status not in _TERMINAL_STATUSES:
+            handler(job_id, job, data)
+
+    def _on_execution_start(self, job_id: str, job: JobState, data: dict):
+        job.status = JobStatus.executing
+        job.progress = 0.0
+        logger.info(f"Job {job_id} started executing")
+
+    def _on_progress(self, job_id: str, job: JobState, data: dict):
+        done = data.get("value", 0)
+        max_val = data.get("max", job.sample_count)
+        job.samples_done = done
+        if max_val > 0:
+            job.progress = done / max_val
+
+    def _on_executing(self, job_id: str, job: JobState, data: dict):
+        if data.get("node") is None:
+            # Execution finished, complete once result images arrived
+            self._spawn(self._finish_job(job_id))
+        else:
+            # Node executing
+            job.nodes_done += 1
+
+    def _on_executed(self, job_id: str, job: JobState, data: dict):
+        # Check for output images
+        images = (data.get("output") or {}).get("images", [])
+        # Download in the background so the websocket keeps being read
+        self._image_fetches.setdefault(job_id, []).extend(
+            self._spawn(self._fetch_result_image(job_id, img_info))
+            for img_info in images
+        )
 
-    async def _fetch_result_image(self, job_id: str, img_info: dict):
-        """Fetch a result image from ComfyUI."""
-        if not self._session:
+    def _on_execution_error(self, job_id: str, job: JobState, data: dict):
+        error = data.get("exception_message", "Unknown error")
+        job.status = JobStatus.error
+        job.error = error
+        job.done_event.set()
+        self._image_fetches.pop(job_id, None)
+        self._release_result_key(job_id, job)
+        logger.error(f"Job {job_id} failed: {error}")
+
+    def _on_execution_interrupted(self, job_id: str, job: JobState, data: dict):
+        job.status = JobStatus.interrupted
+        job.done_event.set()
+        self._image_fetches.pop(job_id, None)
+        self._release_result_key(job_id, job)
+        logger.info(f"Job {job_id} interrupted")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run coro in the background, keeping a reference until it is done."""
+        task = asyncio.create_task(coro)
+        self._bg_tasks.add(task)
+        task.add_done_callback(self._bg_tasks.discard)
+        return task
+
+    async def _finish_job(self, job_id: str):
+        """Store the job's result images in output order and mark it finished."""
+        fetches = self._image_fetches.pop(job_id, [])
+        images = await asyncio.gather(*fetches)
+        job = self.jobs.get(job_id)
+        if job is None:
             return
+        job.images.extend(image for image in images if image)
+        self._release_result_key(job_id, job)
+        if job.status not in _TERMINAL_STATUSES:
+            job.status = JobStatus.finished
+            job.progress = 1.0
+            logger.info(f"Job {job_id} finished")
+            if job.result_key is not None and job.images:
+                self._cache_result(job.result_key, job.images)
+        job.done_event.set()
+
+    async def _fetch_result_image(self, job_id: str, img_info: dict) -> bytes | memoryview | None:
+        """Fetch a result image from ComfyUI, waiting for a free download slot."""
+        async with self._fetch_slots:
+            return await self._download_result_image(job_id, img_info)
+
+    async def _download_result_image(
+        self, job_id: str, img_info: dict
+    ) -> bytes | memoryview | None:
+        if not self._session:
+            return None
 
         source = img_info.get("source")
         image_id = img_info.get("id")
         if source == "http" and image_id:
             try:
                 image_data = await self._fetch_etn_image(image_id)
-                if image_data and job_id in self.jobs:
-                    self.jobs[job_id].images.append(image_data)
+                if image_data:
                     logger.info(f"Fetched ETN image for job {job_id}: {image_id}")
+                return image_data
             except Exception as e:
                 logger.error(f"Failed to fetch ETN image {image_id}: {e}")
-            return
+            return None
 
         filename = img_info.get("filename")
         subfolder = img_info.get("subfolder", "")
         img_type = img_info.get("type", "output")
 
         if not filename:
-            return
+            return None
 
         try:
             params = {
@@ -793,19 +1260,67 @@ class ComfyClientManager:
                 "type": img_type,
             }
             async with self._session.get(
-                f"{self.url}/view",
+                self._urls["view"],
                 params=params,
-                timeout=60
+                timeout=TRANSFER_TIMEOUT,
             ) as resp:
                 if resp.status == 200:
-                    image_data = await resp.read()
-                    if job_id in self.jobs:
-                        self.jobs[job_id].images.append(image_data)
-                        logger.info(f"Fetched image for job {job_id}: {filename}")
-                else:
-                    logger.error(f"Failed to fetch image: status {resp.status}")
+                    image_data = await _read_body(resp)
+                    logger.info(f"Fetched image for job {job_id}: {filename}")
+                    return image_data
+                logger.error(f"Failed to fetch image: status {resp.status}")
         except Exception as e:
             logger.error(f"Failed to fetch image {filename}: {e}")
+        return None
+
+
+def _json_dumps(value) -> str:
+    """JSON encoder for ``json=`` request bodies of the session."""
+    return orjson.dumps(value).decode()
+
+
+def _server_version(system_stats: dict) -> str:
+    """Summary of the server build from /system_stats, without volatile fields."""
+    system = system_stats.get("system") or {}
+    keys = ("comfyui_version", "python_version", "pytorch_version", "argv")
+    return orjson.dumps({key: system.get(key) for key in keys}).decode()
+
+
+def _build_prompt(work: WorkflowInput, models):
+    """Create the workflow graph and its JSON encoding, which is sent to the
+    server as is. Keys are sorted so equal graphs encode to equal bytes."""
+    workflow = create_workflow(work, models, comfy_mode=ComfyRunMode.server)
+    return workflow, orjson.dumps(workflow.root, option=orjson.OPT_SORT_KEYS)
+
+
+def _workflow_digest(prompt_json: bytes) -> str:
+    """Stable digest of an encoded prompt graph, used as result cache key."""
+    return hashlib.blake2b(prompt_json, digest_size=16).hexdigest()
+
+
+async def _read_body(resp: aiohttp.ClientResponse, chunk_size: int = 64 * 1024) -> bytes | memoryview:
+    """Read a response body into a single buffer sized by Content-Length.
+
+    Unlike resp.read(), this doesn't keep the received chunks and their
+    joined copy alive at the same time.
+    """
+    size = resp.content_length
+    if not size:
+        return await resp.read()
+    buf = bytearray(size)
+    view = memoryview(buf)
+    offset = 0
+    async for chunk in resp.content.iter_chunked(chunk_size):
+        end = offset + len(chunk)
+        if end > size:
+            # More data than announced, fall back to growing the buffer
+            view.release()
+            buf[offset:] = chunk
+            view = memoryview(buf)
+        else:
+            view[offset:end] = chunk
+        offset = end
+    return view[:offset]
 
 
 # Singleton instance
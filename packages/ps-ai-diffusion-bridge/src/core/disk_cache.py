@@ -0,0 +1,48 @@
+"""Small JSON cache on disk for server responses which rarely change.
+
+Files live in BRIDGE_CACHE_DIR, or ~/.cache/ps-ai-diffusion-bridge by default.
+Entries are best effort: any read or write error is treated as a cache miss.
+"""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(
+    os.getenv("BRIDGE_CACHE_DIR", Path.home() / ".cache" / "ps-ai-diffusion-bridge")
+)
+
+
+def cache_path(name: str, *key_parts: str | None) -> Path:
+    """Path of the cache file for name, distinguished by a digest of key_parts."""
+    key = "\0".join(part or "" for part in key_parts)
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+    return CACHE_DIR / f"{name}-{digest}.json"
+
+
+def read_json(path: Path) -> Any | None:
+    """Return the cached value, or None if there is no usable entry."""
+    try:
+        return orjson.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.debug("Ignoring cache file %s: %s", path, e)
+        return None
+
+
+def write_json(path: Path, value: Any) -> None:
+    """Store value, replacing the file atomically so readers never see partial data."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(value))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.debug("Failed to write cache file %s: %s", path, e)
+
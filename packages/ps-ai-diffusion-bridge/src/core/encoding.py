@@ -0,0 +1,14 @@
+"""Base64 decoding of image and model data sent by clients."""
+import binascii
+
+
+def decode_base64(data: str) -> bytes:
+    """Decode base64 data, which may be given as a data URL ("data:...;base64,...").
+
+    binascii reads an ASCII str in place, base64.b64decode would first copy
+    the whole string into a bytes object.
+    """
+    comma = data.find(",")
+    if comma >= 0:
+        data = data[comma + 1:]
+    return binascii.a2b_base64(data)
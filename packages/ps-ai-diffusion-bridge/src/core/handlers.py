@@ -4,15 +4,21 @@ These handlers contain pure business logic without any framework-specific code.
 They can be used by both FastAPI and aiohttp (ComfyUI extension).
 """
 import os
-import base64
+import asyncio
+import binascii
+import hashlib
 import re
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, asdict
 from typing import Optional
 
+import orjson
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
 from .state import state, ConnectionStatus, BackendType
 from .comfy_client_manager import get_manager, JobStatus
 from .cloud_client_manager import cloud_manager
 from .cloud_types import CloudJobStatus
+from .encoding import decode_base64
 from .styles import load_styles, get_style_summary
 from .upscaler import DEFAULT_UPSCALE_MODEL
 
@@ -20,16 +26,73 @@ from .upscaler import DEFAULT_UPSCALE_MODEL
 DEFAULT_COMFY_URL = "http://localhost:8188"
 
 
-@dataclass
+@dataclass(slots=True)
 class ApiResponse:
     """Standard API response wrapper."""
     data: dict
     status: int = 200
 
 
-@dataclass
-class GenerateParams:
+class _Params(BaseModel):
+    """Base for request parameter models.
+
+    Explicit nulls in the request fall back to the field default, matching
+    clients which send ``null`` for unset values.
+    """
+    model_config = ConfigDict(frozen=True)
+
+    @model_validator(mode="before")
+    @classmethod
+    def _drop_nulls(cls, data):
+        if isinstance(data, dict):
+            return {k: v for k, v in data.items() if v is not None}
+        return data
+
+
+class LoraEntry(_Params):
+    """LoRA applied to a generation.
+
+    data is optional; if omitted, the LoRA is treated as a reference-only name.
+    """
+
+    name: str
+    strength: float = 1.0
+    data: Optional[str] = None  # base64-encoded safetensors bytes
+
+
+class ControlEntry(_Params):
+    """Control layer (ControlNet / IP-Adapter)."""
+
+    mode: str  # shared.resources.ControlMode member name, e.g. "reference", "pose", "canny_edge"
+    image: Optional[str] = None  # base64 PNG
+    strength: float = 1.0
+    range: Optional[list[float]] = None  # [start, end]
+    # Older clients send the range as separate values
+    range_start: float = 0.0
+    range_end: float = 1.0
+
+
+class RegionEntry(_Params):
+    """Region for regional prompting/control."""
+
+    positive: str = ""
+    mask: str  # base64 PNG mask
+    bounds: Optional[dict] = None  # {x,y,width,height}, derived from the mask if omitted
+    control: list[ControlEntry] = Field(default_factory=list)
+    loras: list[LoraEntry] = Field(default_factory=list)  # payload upload supported
+
+
+class GenerateParams(_Params):
     """Parameters for image generation."""
+
+    @model_validator(mode="before")
+    @classmethod
+    def _control_alias(cls, data):
+        # Some clients send "controls" instead of "control"
+        if isinstance(data, dict) and not data.get("control") and data.get("controls"):
+            data = {**data, "control": data["controls"]}
+        return data
+
     prompt: str
     negative_prompt: str = ""
     width: int = 512
@@ -52,33 +115,17 @@ class GenerateParams:
     inpaint_padding: int = 0
     inpaint_grow: int = 0
     inpaint_feather: int = 0
-    # Optional LoRAs. Each entry can contain:
-    # - name: str (required)
-    # - strength: float (optional, default 1.0)
-    # - data: str (optional, base64-encoded safetensors bytes for upload)
-    loras: list[dict] = field(default_factory=list)
-    # Optional Control layers (ControlNet / IP-Adapter).
-    # Each entry can contain:
-    # - mode: str (shared.resources.ControlMode member name, e.g. "reference", "pose", "canny_edge")
-    # - image: str (optional, base64 PNG)
-    # - strength: float (optional)
-    # - range: [float, float] (optional)
-    control: list[dict] = field(default_factory=list)
-    # Optional regions (for regional prompting/control).
-    # Each entry can contain:
-    # - positive: str
-    # - mask: str (base64 PNG mask)
-    # - bounds: optional {x,y,width,height} (if omitted, derived from mask non-zero bbox)
-    # - control: optional list like GenerateParams.control
-    # - loras: optional list like GenerateParams.loras (payload upload supported)
-    regions: list[dict] = field(default_factory=list)
+    # Optional LoRAs, control layers and regions
+    loras: list[LoraEntry] = Field(default_factory=list)
+    control: list[ControlEntry] = Field(default_factory=list)
+    regions: list[RegionEntry] = Field(default_factory=list)
     # Optional performance settings (best-effort override for resolution)
     performance: dict | None = None
 
 
-@dataclass
-class UpscaleParams:
+class UpscaleParams(_Params):
     """Parameters for image upscaling."""
+
     image: str  # Base64 encoded PNG
     factor: float = 2.0
     model: str = ""
@@ -94,12 +141,12 @@ class UpscaleParams:
     seed: int = -1
     strength: float = 0.35
     tile_overlap: int = -1
-    loras: list[dict] = field(default_factory=list)
+    loras: list[LoraEntry] = Field(default_factory=list)
 
 
-@dataclass
-class ControlImageParams:
+class ControlImageParams(_Params):
     """Parameters for control image preprocessing."""
+
     mode: str
     image: str
     bounds: Optional[dict] = None
@@ -174,6 +221,18 @@ async def handle_auth_confirm() -> ApiResponse:
         return ApiResponse(data={"error": str(e), "status": "error"}, status=500)
 
 
+async def handle_auth_cancel() -> ApiResponse:
+    """Abort a pending sign-in, e.g. when the user closed the browser tab.
+
+    Returns:
+        ApiResponse with status cancelled.
+    """
+    cloud_manager.cancel_sign_in()
+    if state.connection_status == ConnectionStatus.auth_pending:
+        state.connection_status = ConnectionStatus.disconnected
+    return ApiResponse(data={"status": "cancelled"})
+
+
 async def handle_auth_validate(token: str) -> ApiResponse:
     """Validate an existing token.
 
@@ -243,6 +302,17 @@ async def handle_get_connection() -> ApiResponse:
         })
 
 
+def connection_cache_key() -> Optional[tuple]:
+    """Return a key that changes whenever the connection response may change.
+
+    Only the local backend is covered; the cloud response also depends on
+    user, model and news data held by the cloud manager.
+    """
+    if state.backend_type == BackendType.cloud:
+        return None
+    return (state.version, get_manager().is_connected)
+
+
 async def handle_get_diagnostics() -> ApiResponse:
     """Handle diagnostics request for local backend."""
     if state.backend_type == BackendType.cloud:
@@ -253,14 +323,22 @@ async def handle_get_diagnostics() -> ApiResponse:
             "missing_required_models": [],
             "missing_optional_models": [],
             "error": "Diagnostics only available for local backend",
+            "event_loop": _event_loop_name(),
         })
 
     manager = get_manager()
     diagnostics = await manager.get_diagnostics()
     diagnostics["backend"] = state.backend_type.value
+    diagnostics["event_loop"] = _event_loop_name()
     return ApiResponse(data=diagnostics)
 
 
+def _event_loop_name() -> str:
+    """Module of the running event loop, eg. "uvloop" or "asyncio"."""
+    loop = asyncio.get_running_loop()
+    return type(loop).__module__.split(".", 1)[0]
+
+
 async def handle_post_connection(
     backend: str = "local",
     comfy_url: Optional[str] = None,
@@ -351,17 +429,32 @@ async def _handle_generate_local(params: GenerateParams) -> ApiResponse:
         )
 
     try:
-        work, _ = _build_workflow_input(params)
-        job_id = await manager.enqueue_workflow(
-            work,
-            batch_size=params.batch_size,
-            seed=work.sampling.seed if work.sampling else 0,
-        )
+        work, _ = await asyncio.to_thread(_build_workflow_input, params)
+        if params.seed < 0 and work.sampling:
+            # Random seed: may share one ComfyUI batch with identical requests
+            job_id = await manager.enqueue_workflow_batched(
+                _coalesce_key(params),
+                work,
+                batch_size=params.batch_size,
+            )
+        else:
+            job_id = await manager.enqueue_workflow(
+                work,
+                batch_size=params.batch_size,
+                seed=work.sampling.seed if work.sampling else 0,
+            )
         return ApiResponse(data={"job_id": job_id, "status": "queued"})
     except Exception as e:
         return ApiResponse(data={"error": str(e)}, status=500)
 
 
+def _coalesce_key(params: GenerateParams) -> bytes:
+    """Key identifying requests which build the same workflow apart from the seed."""
+    values = params.model_dump()
+    del values["seed"], values["batch_size"]
+    return hashlib.blake2b(orjson.dumps(values, option=orjson.OPT_SORT_KEYS)).digest()
+
+
 async def _handle_generate_cloud(params: GenerateParams) -> ApiResponse:
     """Handle generate request for cloud backend."""
     if not cloud_manager.is_connected:
@@ -372,8 +465,17 @@ async def _handle_generate_cloud(params: GenerateParams) -> ApiResponse:
 
     try:
         # Build WorkflowInput from GenerateParams
-        work, lora_payloads = _build_workflow_input(params)
-        job_id = await cloud_manager.enqueue(work, lora_payloads=lora_payloads)
+        work, lora_payloads = await asyncio.to_thread(_build_workflow_input, params)
+        if params.seed < 0 and work.sampling:
+            # Random seed: may share one cloud job with identical requests
+            job_id = await cloud_manager.enqueue_batched(
+                _coalesce_key(params),
+                work,
+                lora_payloads=lora_payloads,
+                batch_size=params.batch_size,
+            )
+        else:
+            job_id = await cloud_manager.enqueue(work, lora_payloads=lora_payloads)
         return ApiResponse(data={"job_id": job_id, "status": "queued"})
     except Exception as e:
         return ApiResponse(data={"error": str(e)}, status=500)
@@ -491,11 +593,11 @@ def _build_workflow_input(params: GenerateParams):
         negative=negative_clean,
     )
 
-    def parse_control_list(items: list[dict]) -> list[ControlInput]:
+    def parse_control_list(items: list[ControlEntry]) -> list[ControlInput]:
         controls: list[ControlInput] = []
-        for entry in items or []:
+        for entry in items:
             try:
-                mode_raw = str(entry.get("mode", "")).strip()
+                mode_raw = entry.mode.strip()
                 if not mode_raw:
                     continue
                 mode_key = mode_raw.lower()
@@ -503,22 +605,17 @@ def _build_workflow_input(params: GenerateParams):
                     raise ValueError(f"Unknown control mode: {mode_raw}")
                 mode = ControlMode[mode_key]
 
-                strength = float(entry.get("strength", 1.0))
-                r = entry.get("range")
-                if isinstance(r, (list, tuple)) and len(r) == 2:
-                    range_tuple = (float(r[0]), float(r[1]))
+                strength = entry.strength
+                r = entry.range
+                if r is not None and len(r) == 2:
+                    range_tuple = (r[0], r[1])
                 else:
-                    range_tuple = (
-                        float(entry.get("range_start", 0.0)),
-                        float(entry.get("range_end", 1.0)),
-                    )
+                    range_tuple = (entry.range_start, entry.range_end)
 
-                img_b64 = entry.get("image")
+                img_b64 = entry.image
                 img = None
-                if isinstance(img_b64, str) and img_b64:
-                    if "," in img_b64:
-                        img_b64 = img_b64.split(",", 1)[1]
-                    img_bytes = base64.b64decode(img_b64)
+                if img_b64:
+                    img_bytes = decode_base64(img_b64)
                     img = Image.from_bytes(img_bytes)
 
                 controls.append(
@@ -539,7 +636,7 @@ def _build_workflow_input(params: GenerateParams):
 
     # Build sampling
     import random
-    seed = params.seed if params.seed >= 0 else random.randint(0, 2**31 - 1)
+    seed = params.seed if params.seed >= 0 else random.getrandbits(31)
     sampling = SamplingInput(
         sampler=params.sampler,
         scheduler=params.scheduler,
@@ -556,18 +653,18 @@ def _build_workflow_input(params: GenerateParams):
 
     # Optional LoRA payload uploads (base64 safetensors)
     lora_payloads: dict[str, tuple[str, bytes]] = {}
-    for entry in (params.loras or []):
+    for entry in params.loras:
         try:
-            name = str(entry.get("name", "")).strip()
+            name = entry.name.strip()
             if not name:
                 continue
-            strength = float(entry.get("strength", 1.0))
-            data_b64 = entry.get("data")
-            if isinstance(data_b64, str) and data_b64:
+            strength = entry.strength
+            data_b64 = entry.data
+            if data_b64:
                 import hashlib
                 import base64 as _b64
 
-                raw = _b64.b64decode(data_b64)
+                raw = decode_base64(data_b64)
                 storage_id = _b64.b64encode(hashlib.sha256(raw).digest()).decode("utf-8")
                 lora_payloads[name] = (storage_id, raw)
                 loras.append(LoraInput(name=name, strength=strength, storage_id=storage_id))
@@ -580,24 +677,22 @@ def _build_workflow_input(params: GenerateParams):
 
     # Regions (regional prompts/control/loras)
     regions: list[RegionInput] = []
-    for region_entry in (params.regions or []):
+    for region_entry in params.regions:
         try:
-            region_positive = str(region_entry.get("positive", "")).strip()
+            region_positive = region_entry.positive.strip()
             region_prompt_clean, region_lora_tags = _parse_lora_tags(region_positive)
 
-            mask_b64 = region_entry.get("mask")
-            if not (isinstance(mask_b64, str) and mask_b64):
+            mask_b64 = region_entry.mask
+            if not mask_b64:
                 continue
-            if "," in mask_b64:
-                mask_b64 = mask_b64.split(",", 1)[1]
-            mask_bytes = base64.b64decode(mask_b64)
+            mask_bytes = decode_base64(mask_b64)
             region_mask = Image.from_bytes(mask_bytes)
             if not region_mask.is_mask:
                 # Best-effort conversion to grayscale
                 region_mask = region_mask.to_grayscale()
 
-            bounds_data = region_entry.get("bounds")
-            if isinstance(bounds_data, dict):
+            bounds_data = region_entry.bounds
+            if bounds_data is not None:
                 bounds = Bounds(
                     int(bounds_data.get("x", 0)),
                     int(bounds_data.get("y", 0)),
@@ -614,22 +709,22 @@ def _build_workflow_input(params: GenerateParams):
                 bounds = Bounds(x, y, w, h)
 
             # Region control layers
-            region_controls = parse_control_list(region_entry.get("control", []) or [])
+            region_controls = parse_control_list(region_entry.control)
 
             # Region loras: tags + payload list (optional)
             region_loras: list[LoraInput] = [LoraInput(name=n, strength=s) for n, s in region_lora_tags]
-            for entry in (region_entry.get("loras", []) or []):
+            for entry in region_entry.loras:
                 try:
-                    name = str(entry.get("name", "")).strip()
+                    name = entry.name.strip()
                     if not name:
                         continue
-                    strength = float(entry.get("strength", 1.0))
-                    data_b64 = entry.get("data")
-                    if isinstance(data_b64, str) and data_b64:
+                    strength = entry.strength
+                    data_b64 = entry.data
+                    if data_b64:
                         import hashlib
                         import base64 as _b64
 
-                        raw = _b64.b64decode(data_b64)
+                        raw = decode_base64(data_b64)
                         storage_id = _b64.b64encode(hashlib.sha256(raw).digest()).decode("utf-8")
                         lora_payloads[name] = (storage_id, raw)
                         region_loras.append(
@@ -690,10 +785,7 @@ def _build_workflow_input(params: GenerateParams):
     crop_upscale_extent = None
 
     if params.image:
-        image_b64 = params.image
-        if "," in image_b64:
-            image_b64 = image_b64.split(",", 1)[1]
-        image_bytes = base64.b64decode(image_b64)
+        image_bytes = decode_base64(params.image)
         initial_image = Image.from_bytes(image_bytes)
         images = ImageInput(extent=extent_input, initial_image=initial_image)
 
@@ -701,10 +793,7 @@ def _build_workflow_input(params: GenerateParams):
         if not params.image:
             raise ValueError("mask requires image input (inpaint/refine_region)")
 
-        mask_b64 = params.mask
-        if "," in mask_b64:
-            mask_b64 = mask_b64.split(",", 1)[1]
-        mask_bytes = base64.b64decode(mask_b64)
+        mask_bytes = decode_base64(params.mask)
         mask_img = Image.from_bytes(mask_bytes)
         if not mask_img.is_mask:
             # Ensure grayscale mask
@@ -845,9 +934,25 @@ async def handle_get_job(job_id: str) -> ApiResponse:
         })
 
 
+def _encode_images_sync(images: list[bytes], _b2a=binascii.b2a_base64) -> list[str]:
+    return [_b2a(img, newline=False).decode("ascii") for img in images]
+
+
+async def _encode_images(images: list[bytes]) -> list[str]:
+    """Base64-encode result images in a worker thread.
+
+    Encoding a batch of multi-megabyte PNGs takes long enough to stall the
+    event loop, so it is kept off it.
+    """
+    return await asyncio.to_thread(_encode_images_sync, list(images))
+
+
 async def handle_get_job_images(job_id: str) -> ApiResponse:
     """Handle get job images request (base64 encoded).
 
+    Prefer the binary ``/jobs/{job_id}/images/{index}`` endpoint where
+    possible; it avoids the base64 size overhead and encoding cost.
+
     Returns:
         ApiResponse with images array, or error with status 400/404.
     """
@@ -865,8 +970,7 @@ async def handle_get_job_images(job_id: str) -> ApiResponse:
         if not job.images:
             return ApiResponse(data={"error": "No images available"}, status=404)
 
-        # Convert to base64
-        images_b64 = [base64.b64encode(img).decode("utf-8") for img in job.images]
+        images_b64 = await _encode_images(job.images)
 
         # Cloud jobs don't track seed, return 0 for each
         seeds = [0 for _ in range(len(job.images))]
@@ -892,8 +996,7 @@ async def handle_get_job_images(job_id: str) -> ApiResponse:
         if not job.images:
             return ApiResponse(data={"error": "No images available"}, status=404)
 
-        # Convert to base64
-        images_b64 = [base64.b64encode(img).decode("utf-8") for img in job.images]
+        images_b64 = await _encode_images(job.images)
 
         # Calculate seed for each image (seed + index)
         seeds = [job.seed + i for i in range(len(job.images))]
@@ -905,6 +1008,10 @@ async def handle_get_job_images(job_id: str) -> ApiResponse:
         })
 
 
+# Images of a finished job never change, so clients may keep them cached
+IMAGE_CACHE_HEADERS = {"Cache-Control": "private, max-age=86400, immutable"}
+
+
 async def handle_get_job_image(job_id: str, index: int) -> tuple[bytes, str] | ApiResponse:
     """Handle get single job image request (binary).
 
@@ -1050,11 +1157,8 @@ async def handle_upscale(params: UpscaleParams) -> ApiResponse:
             )
             from shared.image import Image, Extent
 
-            image_b64 = params.image
-            if "," in image_b64:
-                image_b64 = image_b64.split(",", 1)[1]
             try:
-                image_bytes = base64.b64decode(image_b64)
+                image_bytes = decode_base64(params.image)
             except Exception as e:
                 return ApiResponse(data={"error": f"Invalid base64 image: {e}"}, status=400)
 
@@ -1063,7 +1167,7 @@ async def handle_upscale(params: UpscaleParams) -> ApiResponse:
             extent_input = ExtentInput(image.extent, target_extent, target_extent, target_extent)
             images = ImageInput(extent=extent_input, initial_image=image)
 
-            seed = params.seed if params.seed >= 0 else random.randint(0, 2**31 - 1)
+            seed = params.seed if params.seed >= 0 else random.getrandbits(31)
             total_steps = max(1, int(params.steps))
             denoise = float(params.strength)
             denoise = max(0.05, min(0.95, denoise))
@@ -1085,15 +1189,10 @@ async def handle_upscale(params: UpscaleParams) -> ApiResponse:
             loras: list[LoraInput] = []
             for name, strength in lora_tags:
                 loras.append(LoraInput(name=name, strength=strength))
-            for entry in (params.loras or []):
-                try:
-                    name = str(entry.get("name", "")).strip()
-                    if not name:
-                        continue
-                    strength = float(entry.get("strength", 1.0))
-                    loras.append(LoraInput(name=name, strength=strength))
-                except Exception:
-                    continue
+            for entry in params.loras:
+                name = entry.name.strip()
+                if name:
+                    loras.append(LoraInput(name=name, strength=entry.strength))
 
             if not params.checkpoint:
                 return ApiResponse(data={"error": "checkpoint is required for refine upscaling"}, status=400)
@@ -1137,12 +1236,8 @@ async def handle_upscale(params: UpscaleParams) -> ApiResponse:
                 )
 
             # Decode base64 (strip data URL prefix if present)
-            image_b64 = params.image
-            if "," in image_b64:
-                image_b64 = image_b64.split(",", 1)[1]
-
             try:
-                image_bytes = base64.b64decode(image_b64)
+                image_bytes = decode_base64(params.image)
             except Exception as e:
                 return ApiResponse(data={"error": f"Invalid base64 image: {e}"}, status=400)
 
@@ -1179,7 +1274,6 @@ async def handle_control_image(params: ControlImageParams) -> ApiResponse:
     """Handle control image preprocessing request."""
     try:
         import src.path_setup  # noqa: F401
-        import base64 as _b64
 
         from shared.api import WorkflowKind
         from shared.image import Image, Bounds
@@ -1191,11 +1285,8 @@ async def handle_control_image(params: ControlImageParams) -> ApiResponse:
         if mode_raw not in ControlMode.__members__:
             return ApiResponse(data={"error": f"Unknown control mode: {params.mode}"}, status=400)
 
-        image_b64 = params.image
-        if "," in image_b64:
-            image_b64 = image_b64.split(",", 1)[1]
-        image_bytes = _b64.b64decode(image_b64)
-        image = Image.from_bytes(image_bytes)
+        image_bytes = decode_base64(params.image)
+        image = await asyncio.to_thread(Image.from_bytes, image_bytes)
 
         perf_settings = PerformanceSettings()
         perf_override = params.performance or {}
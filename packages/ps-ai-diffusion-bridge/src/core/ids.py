@@ -0,0 +1,13 @@
+"""Job id generation."""
+import itertools
+import secrets
+
+# Random per-process prefix keeps ids unique across restarts, the counter
+# keeps them unique within a process without reading os.urandom every time.
+_job_prefix = secrets.token_hex(8)
+_job_counter = itertools.count()
+
+
+def new_job_id() -> str:
+    """Return a new unique job id."""
+    return f"{_job_prefix}-{next(_job_counter):016x}"
@@ -29,6 +29,13 @@ class AppState:
     # Cloud-specific state
     cloud_user: Optional[CloudUser] = None
     cloud_token: Optional[str] = None
+    # Bumped on every field assignment so callers can cache derived data
+    version: int = field(default=0, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name != "version":
+            super().__setattr__("version", getattr(self, "version", 0) + 1)
 
 
 # Global application state
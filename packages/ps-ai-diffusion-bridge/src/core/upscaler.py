@@ -2,10 +2,11 @@
 
 Builds a simple upscale workflow using UpscaleModelLoader and ImageUpscaleWithModel nodes.
 """
-import base64
 import uuid
 from pathlib import Path
 
+from .encoding import decode_base64
+
 DEFAULT_UPSCALE_MODEL = "4x-UltraSharp.pth"
 MAX_INPUT_SIZE = 2048  # Maximum input image size (longest edge)
 
@@ -92,11 +93,8 @@ async def save_base64_image(image_base64: str, comfy_input_dir: str) -> str:
     Returns:
         Filename of saved image
     """
-    # Strip data URL prefix if present
-    if "," in image_base64:
-        image_base64 = image_base64.split(",")[1]
-
-    image_data = base64.b64decode(image_base64)
+    # Strips the data URL prefix if present
+    image_data = decode_base64(image_base64)
     filename = f"ps_upscale_{uuid.uuid4().hex[:8]}.png"
     filepath = Path(comfy_input_dir) / filename
 
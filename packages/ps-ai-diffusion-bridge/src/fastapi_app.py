@@ -5,9 +5,11 @@ This module provides REST API endpoints for the standalone FastAPI service (port
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Any, Optional
+
+import orjson
 
 from src.core import get_manager
 from src.core.handlers import (
@@ -30,9 +32,13 @@ from src.core.handlers import (
     handle_custom_workflow,
     handle_auth_sign_in,
     handle_auth_confirm,
+    handle_auth_cancel,
     handle_auth_validate,
+    connection_cache_key,
+    IMAGE_CACHE_HEADERS,
 )
 from src.core.cloud_client_manager import cloud_manager
+from src.core.aiohttp_request_manager import shutdown_shared_session
 
 
 @asynccontextmanager
@@ -45,9 +51,51 @@ async def lifespan(app: FastAPI):
         await manager.disconnect()
     if cloud_manager.is_connected:
         await cloud_manager.disconnect()
+    await shutdown_shared_session()
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Noticeably faster than the stdlib encoder for the large base64 image
+    lists and the frequently polled status endpoints.
+    """
 
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class _CachedJSON:
+    """Serialized JSON body, reused while its cache key stays the same.
+
+    Used for endpoints the plugin polls frequently and whose payload rarely
+    changes between polls.
+    """
 
-app = FastAPI(title="PS AI Bridge", version="0.1.0", lifespan=lifespan)
+    def __init__(self):
+        self._key = None
+        self._body = b""
+
+    def get(self, key) -> Optional[Response]:
+        if key is None or key != self._key:
+            return None
+        return Response(content=self._body, media_type="application/json")
+
+    def put(self, key, data) -> Response:
+        self._body = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        self._key = key
+        return Response(content=self._body, media_type="application/json")
+
+
+_connection_response = _CachedJSON()
+
+
+app = FastAPI(
+    title="PS AI Bridge",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # Enable CORS for UXP plugin access
 app.add_middleware(
@@ -60,6 +108,8 @@ app.add_middleware(
 
 
 # Request/Response Models (Pydantic for FastAPI validation)
+# Generation, upscale and control-image requests use the parameter models
+# from src.core.handlers directly.
 
 class ConnectionRequest(BaseModel):
     backend: str = "local"
@@ -67,97 +117,15 @@ class ConnectionRequest(BaseModel):
     auth_token: Optional[str] = None
 
 
-class LoraRequest(BaseModel):
-    """Optional LoRA payload for cloud service.
-
-    Notes:
-        data is optional; if omitted, LoRA is treated as a reference-only name.
-    """
-
-    name: str
-    strength: float = 1.0
-    data: Optional[str] = None  # base64-encoded safetensors bytes
-
-
-class ControlRequest(BaseModel):
-    mode: str
-    image: Optional[str] = None  # base64 PNG
-    strength: float = 1.0
-    range: Optional[list[float]] = None  # [start, end]
-
-
-class RegionRequest(BaseModel):
-    positive: str = ""
-    mask: str  # base64 PNG mask
-    bounds: Optional[dict] = None  # {x,y,width,height}
-    control: list[ControlRequest] = []
-    loras: list[LoraRequest] = []
-
-
-class GenerateRequest(BaseModel):
-    prompt: str
-    negative_prompt: str = ""
-    width: int = 512
-    height: int = 512
-    steps: int = 20
-    cfg_scale: float = 7.0
-    seed: int = -1
-    model: str = ""
-    batch_size: int = 1
-    sampler: str = "euler"
-    scheduler: str = "normal"
-    image: Optional[str] = None  # Base64 encoded PNG
-    strength: float = 1.0  # 0.0-1.0 (img2img / refine)
-    mask: Optional[str] = None  # Base64 encoded PNG mask (inpaint/refine_region)
-    # Inpaint parameters (best-effort mapping to shared.api.InpaintParams)
-    inpaint_mode: str = "automatic"
-    inpaint_fill: str = "neutral"
-    inpaint_context: str = "automatic"
-    inpaint_padding: int = 0
-    inpaint_grow: int = 0
-    inpaint_feather: int = 0
-    loras: list[LoraRequest] = []
-    control: list[ControlRequest] = []
-    regions: list[RegionRequest] = []
-    performance: Optional[dict] = None
-
-
 class GenerateResponse(BaseModel):
     job_id: str
     status: str
 
 
-class ControlImageRequest(BaseModel):
-    mode: str
-    image: str
-    bounds: Optional[dict] = None
-    seed: int = -1
-    performance: Optional[dict] = None
-
-
 class ControlImageResponse(BaseModel):
     image: str
 
 
-class UpscaleRequest(BaseModel):
-    image: str  # Base64 encoded PNG
-    factor: float = 2.0
-    model: str = ""
-    # Optional tiled diffusion refine after upscaling
-    refine: bool = False
-    checkpoint: str = ""
-    prompt: str = ""
-    negative_prompt: str = ""
-    steps: int = 20
-    cfg_scale: float = 7.0
-    sampler: str = "euler"
-    scheduler: str = "normal"
-    seed: int = -1
-    strength: float = 0.35
-    tile_overlap: int = -1
-    loras: list[LoraRequest] = []
-
-
 class AuthValidateRequest(BaseModel):
     token: str
 
@@ -218,6 +186,13 @@ async def auth_confirm():
     return resp.data
 
 
+@app.post("/api/auth/cancel")
+async def auth_cancel():
+    """Abort a pending sign-in started with /api/auth/sign-in."""
+    resp = await handle_auth_cancel()
+    return resp.data
+
+
 @app.post("/api/auth/validate")
 async def auth_validate(request: AuthValidateRequest):
     """Validate an existing access token.
@@ -232,8 +207,11 @@ async def auth_validate(request: AuthValidateRequest):
 
 @app.get("/api/connection")
 async def get_connection():
+    key = connection_cache_key()
+    if cached := _connection_response.get(key):
+        return cached
     resp = await handle_get_connection()
-    return resp.data
+    return _connection_response.put(key, resp.data)
 
 
 @app.get("/api/diagnostics")
@@ -255,34 +233,8 @@ async def post_connection(request: ConnectionRequest):
 # Generation Endpoints
 
 @app.post("/api/generate", response_model=GenerateResponse)
-async def generate(request: GenerateRequest):
+async def generate(params: GenerateParams):
     """Submit a generation job."""
-    params = GenerateParams(
-        prompt=request.prompt,
-        negative_prompt=request.negative_prompt,
-        width=request.width,
-        height=request.height,
-        steps=request.steps,
-        cfg_scale=request.cfg_scale,
-        seed=request.seed,
-        model=request.model,
-        batch_size=request.batch_size,
-        sampler=request.sampler,
-        scheduler=request.scheduler,
-        image=request.image,
-        strength=request.strength,
-        mask=request.mask,
-        inpaint_mode=request.inpaint_mode,
-        inpaint_fill=request.inpaint_fill,
-        inpaint_context=request.inpaint_context,
-        inpaint_padding=request.inpaint_padding,
-        inpaint_grow=request.inpaint_grow,
-        inpaint_feather=request.inpaint_feather,
-        loras=[l.model_dump() for l in request.loras] if request.loras else [],
-        control=[c.model_dump() for c in request.control] if request.control else [],
-        regions=[r.model_dump() for r in request.regions] if request.regions else [],
-        performance=request.performance,
-    )
     resp = await handle_generate(params)
     if resp.status != 200:
         raise HTTPException(status_code=resp.status, detail=resp.data.get("error"))
@@ -290,14 +242,7 @@ async def generate(request: GenerateRequest):
 
 
 @app.post("/api/control-image", response_model=ControlImageResponse)
-async def control_image(request: ControlImageRequest):
-    params = ControlImageParams(
-        mode=request.mode,
-        image=request.image,
-        bounds=request.bounds,
-        seed=request.seed,
-        performance=request.performance,
-    )
+async def control_image(params: ControlImageParams):
     resp = await handle_control_image(params)
     if resp.status != 200:
         raise HTTPException(status_code=resp.status, detail=resp.data.get("error"))
@@ -329,7 +274,8 @@ async def get_job_image(job_id: str, index: int):
     if isinstance(result, ApiResponse):
         raise HTTPException(status_code=result.status, detail=result.data.get("error"))
     image_data, media_type = result
-    return Response(content=image_data, media_type=media_type)
+    # Results are memoryviews, older starlette versions only render bytes
+    return Response(content=bytes(image_data), media_type=media_type, headers=IMAGE_CACHE_HEADERS)
 
 
 @app.post("/api/jobs/{job_id}/cancel")
@@ -344,25 +290,8 @@ async def cancel_job(job_id: str):
 # Upscale Endpoints
 
 @app.post("/api/upscale", response_model=GenerateResponse)
-async def upscale(request: UpscaleRequest):
+async def upscale(params: UpscaleParams):
     """Submit an upscale job."""
-    params = UpscaleParams(
-        image=request.image,
-        factor=request.factor,
-        model=request.model,
-        refine=request.refine,
-        checkpoint=request.checkpoint,
-        prompt=request.prompt,
-        negative_prompt=request.negative_prompt,
-        steps=request.steps,
-        cfg_scale=request.cfg_scale,
-        sampler=request.sampler,
-        scheduler=request.scheduler,
-        seed=request.seed,
-        strength=request.strength,
-        tile_overlap=request.tile_overlap,
-        loras=[l.model_dump() for l in request.loras] if request.loras else [],
-    )
     resp = await handle_upscale(params)
     if resp.status != 200:
         raise HTTPException(status_code=resp.status, detail=resp.data.get("error"))
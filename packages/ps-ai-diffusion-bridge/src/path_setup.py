@@ -6,15 +6,13 @@ checks in __init__.py.
 """
 import sys
 from pathlib import Path
-import importlib.util
 
-# Add packages directory to path
 packages_path = Path(__file__).parent.parent.parent
-if str(packages_path) not in sys.path:
-    sys.path.insert(0, str(packages_path))
 
 # Pre-register 'shared' as a package in sys.modules to enable relative imports
-# but without executing the original __init__.py which has Krita checks
+# but without executing the original __init__.py which has Krita checks.
+# Submodules are found through the package __path__, so packages/ does not
+# need to be added to sys.path.
 import types
 if 'shared' not in sys.modules:
     shared_module = types.ModuleType('shared')
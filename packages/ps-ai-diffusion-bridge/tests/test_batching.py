@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from src.core.batching import RequestCoalescer
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_batch():
+    submitted = []
+
+    async def submit(payload, count):
+        submitted.append((payload, count))
+        return f"job-{len(submitted)}"
+
+    coalescer = RequestCoalescer(submit, min_wait=0.01)
+    results = await asyncio.gather(
+        coalescer.enqueue("a", "work-1", 1),
+        coalescer.enqueue("a", "work-2", 2),
+        coalescer.enqueue("b", "work-3", 1),
+    )
+
+    assert sorted(submitted) == [("work-1", 3), ("work-3", 1)]
+    batch_a = results[0][0]
+    assert results[0] == (batch_a, 0)
+    assert results[1] == (batch_a, 1)
+    assert results[2][1] == 0 and results[2][0] != batch_a
+
+
+@pytest.mark.asyncio
+async def test_batch_is_split_at_max_size():
+    counts = []
+
+    async def submit(payload, count):
+        counts.append(count)
+        return f"job-{len(counts)}"
+
+    coalescer = RequestCoalescer(submit, max_batch=4, min_wait=0.01)
+    await asyncio.gather(*(coalescer.enqueue("a", None, 2) for _ in range(3)))
+
+    assert sorted(counts) == [2, 4]
+
+
+@pytest.mark.asyncio
+async def test_submit_error_is_raised_for_every_member():
+    async def submit(payload, count):
+        raise RuntimeError("offline")
+
+    coalescer = RequestCoalescer(submit, min_wait=0.01)
+    results = await asyncio.gather(
+        coalescer.enqueue("a", None, 1),
+        coalescer.enqueue("a", None, 1),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_submit_cancels_every_member():
+    async def submit(payload, count):
+        raise asyncio.CancelledError
+
+    coalescer = RequestCoalescer(submit, min_wait=0.01)
+    results = await asyncio.wait_for(asyncio.gather(
+        coalescer.enqueue("a", None, 1),
+        coalescer.enqueue("a", None, 1),
+        return_exceptions=True,
+    ), timeout=1)
+
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_group_cancels_every_member():
+    async def submit(payload, count):
+        return "job"
+
+    coalescer = RequestCoalescer(submit, min_wait=10)
+    members = [asyncio.ensure_future(coalescer.enqueue("a", None, 1)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+    for task in coalescer._tasks:
+        task.cancel()
+    results = await asyncio.wait_for(asyncio.gather(*members, return_exceptions=True), timeout=1)
+
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert not coalescer._pending
@@ -0,0 +1,61 @@
+import orjson
+import pytest
+
+from src.core.comfy_client_manager import ComfyClientManager, JobState, JobStatus
+
+
+class FakeResponse:
+    status = 200
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self):
+        self.deleted = []
+
+    def post(self, url, data=None, **kwargs):
+        self.deleted.extend(orjson.loads(data)["delete"])
+        return FakeResponse()
+
+
+def joined_jobs():
+    """A job with an explicit seed and a second job which joined it."""
+    manager = ComfyClientManager()
+    manager._set_url("http://comfy")
+    manager._session = FakeSession()
+    manager._add_job("original", JobState(status=JobStatus.executing, result_key="key"))
+    manager._add_job("follower", JobState(status=JobStatus.executing))
+    manager._batch_members["follower"] = ("original", 0, 1)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_cancel_original_keeps_prompt_for_followers():
+    manager = joined_jobs()
+
+    assert await manager.cancel("original")
+    assert manager._session.deleted == []
+    assert manager.get_job("original").status == JobStatus.interrupted
+    assert manager.get_job("follower").status == JobStatus.executing
+
+    assert await manager.cancel("follower")
+    assert manager._session.deleted == ["original"]
+    assert manager.get_job("original").status == JobStatus.interrupted
+
+
+@pytest.mark.asyncio
+async def test_cancel_followers_keeps_prompt_for_original():
+    manager = joined_jobs()
+
+    assert await manager.cancel("follower")
+    assert manager._session.deleted == []
+    assert manager.get_job("original").status == JobStatus.executing
+
+    assert await manager.cancel("original")
+    assert manager._session.deleted == ["original"]
+    assert manager.get_job("follower").status == JobStatus.interrupted
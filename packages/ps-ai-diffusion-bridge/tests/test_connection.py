@@ -13,3 +13,19 @@ async def test_connection_status_disconnected():
     data = response.json()
     assert data["status"] == "disconnected"
     assert "backend" in data
+
+
+@pytest.mark.asyncio
+async def test_connection_status_reflects_state_changes():
+    from src.core.state import state, ConnectionStatus
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        first = await client.get("/api/connection")
+        state.connection_status = ConnectionStatus.error
+        state.error_message = "boom"
+        second = await client.get("/api/connection")
+
+    assert first.json()["status"] == "disconnected"
+    assert second.json()["status"] == "error"
+    assert second.json()["error"] == "boom"
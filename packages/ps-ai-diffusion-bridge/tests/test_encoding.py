@@ -0,0 +1,25 @@
+"""Tests for encoding module."""
+import base64
+
+import pytest
+from src.core.encoding import decode_base64
+
+
+def test_decode_base64_plain():
+    """Test decoding plain base64 data."""
+    data = bytes(range(256))
+    assert decode_base64(base64.b64encode(data).decode()) == data
+
+
+def test_decode_base64_data_url():
+    """Test the data URL prefix is stripped before decoding."""
+    encoded = base64.b64encode(b"\x89PNG image").decode()
+    assert decode_base64(f"data:image/png;base64,{encoded}") == b"\x89PNG image"
+
+
+def test_decode_base64_invalid():
+    """Test invalid input raises like base64.b64decode."""
+    with pytest.raises(ValueError):
+        decode_base64("abc")
+    with pytest.raises(ValueError):
+        decode_base64("ünïcode")
@@ -59,3 +59,16 @@ async def test_generate_accepts_image_and_strength():
 
     # Should be 503 (not connected) rather than 422 (validation error)
     assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_generate_rejects_invalid_lora_entry():
+    """Test that malformed LoRA entries fail validation."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/api/generate", json={
+            "prompt": "a cat",
+            "loras": [{"strength": "strong"}],
+        })
+
+    assert response.status_code == 422
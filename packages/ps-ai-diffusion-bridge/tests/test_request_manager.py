@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from src.core.aiohttp_request_manager import AiohttpRequestManager, shutdown_shared_session
+
+
+@pytest.mark.asyncio
+async def test_managers_share_one_session():
+    first = AiohttpRequestManager()
+    second = AiohttpRequestManager(user_agent="test")
+    await first.ensure_session()
+    await second.ensure_session()
+    session = first._session
+
+    assert session is not None
+    assert second._session is session
+
+    # Closing a manager only drops its reference, the pool stays open for others
+    await first.close()
+    await first.close()
+    assert not session.closed
+    await second.ensure_session()
+    assert second._session is session
+
+    await shutdown_shared_session()
+    assert session.closed
+
+
+@pytest.mark.asyncio
+async def test_concurrent_gets_share_one_request():
+    manager = AiohttpRequestManager()
+    calls = []
+
+    async def get(url, timeout, bearer):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return {"models": ["a"]}
+
+    manager._get = get
+    first, second = await asyncio.gather(manager.get("http://x/a"), manager.get("http://x/a"))
+
+    assert calls == ["http://x/a"]
+    assert first == second
+    # Callers may modify their result without affecting the others
+    assert first is not second and first["models"] is not second["models"]